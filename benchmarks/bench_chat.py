@@ -0,0 +1,161 @@
+"""Offline conversational benchmark for S3BucketAssistant.chat.
+
+Replays seeded, scripted conversations through chat() with the deterministic
+FakeChatModel instead of Gemini and reports per-turn CPU and wall time, the
+share of turns answered by rules versus the model, and memory use:
+
+    python benchmarks/bench_chat.py --conversations 5000
+    python benchmarks/bench_chat.py --latency 0.2 --tokens-per-second 80 --stream
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from _common import ROOT, git_commit, percentile
+
+sys.path.insert(0, ROOT)
+os.environ.setdefault("EMA_MODEL_BACKEND", "fake")
+# No MCP server runs here, so skip the background bucket-name checks
+os.environ.setdefault("EMA_PREFETCH", "0")
+
+import client  # noqa: E402
+from fake_model import FakeChatModel  # noqa: E402
+from llm_cache import LLMCache  # noqa: E402
+
+
+# Conversation script: a name, some configuration, a few open questions, then create
+NAME_TURNS = [
+    "I want to create a bucket",
+    "bucket name {name}",
+    "I'd like to name it {name}",
+    "call it {name}",
+]
+CONFIG_TURNS = [
+    "enable versioning",
+    "add tags env=prod team=data",
+    "tag it owner=platform",
+    "block public access",
+    "restrict public access please",
+    "explain the read only policy",
+    "what is a cross account policy",
+    "what are tags",
+]
+OPEN_TURNS = [
+    "what is the difference between S3 standard and glacier?",
+    "how much does storage cost per gigabyte?",
+    "can you recommend lifecycle settings for logs?",
+    "tell me about server side encryption",
+    "is this bucket secure enough for backups?",
+]
+FINAL_TURNS = ["create it", "I'm done", "ready"]
+
+
+def make_conversation(rng, index):
+    name = f"replay-bucket-{index}"
+    turns = [rng.choice(NAME_TURNS).format(name=name)]
+    if "{name}" not in turns[0]:
+        turns.append(f"bucket name {name}")
+    turns += rng.sample(CONFIG_TURNS, rng.randint(1, 4))
+    turns += rng.sample(OPEN_TURNS, rng.randint(0, 3))
+    # Shuffle in place; shuffling the slice turns[1:] would only reorder a copy
+    rest = turns[1:]
+    rng.shuffle(rest)
+    turns[1:] = rest
+    turns.append(rng.choice(FINAL_TURNS))
+    return turns
+
+
+def replay(conversations, fake, stream, use_cache):
+    cpu_times, wall_times = [], []
+    totals = {"turns": 0, "rule_turns": 0, "model_calls": 0, "cache_hits": 0}
+    cache = LLMCache() if use_cache else None
+    assistants = []
+    for turns in conversations:
+        assistant = client.S3BucketAssistant(cache=cache or LLMCache(), model=fake)
+        for message in turns:
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            response = assistant.chat(message, stream=stream)
+            if stream:
+                response = "".join(response)
+            cpu_times.append(time.process_time() - cpu_start)
+            wall_times.append(time.perf_counter() - wall_start)
+        summary = assistant.get_metrics_summary()
+        for key in totals:
+            totals[key] += summary[key]
+        assistants.append(assistant)
+    return cpu_times, wall_times, totals, assistants
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conversations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake model time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="fake model token rate (0 = instant)")
+    parser.add_argument("--stream", action="store_true", help="consume replies through the streaming path")
+    parser.add_argument("--shared-cache", action="store_true", help="share one response cache across conversations")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/chat-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    conversations = [make_conversation(rng, i) for i in range(args.conversations)]
+    fake = FakeChatModel(latency=args.latency, tokens_per_second=args.tokens_per_second)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    cpu_times, wall_times, totals, assistants = replay(
+        conversations, fake, args.stream, args.shared_cache
+    )
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cpu_sorted, wall_sorted = sorted(cpu_times), sorted(wall_times)
+    turns = totals["turns"]
+    results = {
+        "conversations": len(conversations),
+        "turns": turns,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_second": round(turns / elapsed, 1),
+        "cpu_per_turn_us": {
+            "mean": round(sum(cpu_times) / turns * 1e6, 1),
+            "p50": round(percentile(cpu_sorted, 0.50) * 1e6, 1),
+            "p99": round(percentile(cpu_sorted, 0.99) * 1e6, 1),
+        },
+        "wall_per_turn_ms": {
+            "p50": round(percentile(wall_sorted, 0.50) * 1000, 3),
+            "p99": round(percentile(wall_sorted, 0.99) * 1000, 3),
+        },
+        "rule_path_ratio": round(totals["rule_turns"] / turns, 4),
+        "llm_path_ratio": round((turns - totals["rule_turns"]) / turns, 4),
+        "model_calls": totals["model_calls"],
+        "cache_hits": totals["cache_hits"],
+        "memory": {
+            "retained_kb_per_session": round(current / len(assistants) / 1024, 2),
+            "peak_mb": round(peak / 1024 / 1024, 2),
+        },
+    }
+    report = {
+        "benchmark": "chat_replay",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "results": results,
+    }
+    print(json.dumps(results, indent=2))
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"chat-{report['commit']}-{int(time.time())}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
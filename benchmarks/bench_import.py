@@ -0,0 +1,117 @@
+"""Cold-start benchmark for importing client.py.
+
+Times `import <module>` in fresh interpreters, optionally followed by building
+the default model, and lists the slowest imports reported by -X importtime:
+
+    python benchmarks/bench_import.py --runs 10
+    python benchmarks/bench_import.py --with-model --backend fake
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from _common import ROOT, git_commit
+
+TIMER = """
+import time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+if {with_model}:
+    {module}.default_model()
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def run_once(module, with_model, env):
+    output = subprocess.check_output(
+        [sys.executable, "-c", TIMER.format(module=module, with_model=with_model)],
+        cwd=ROOT,
+        env=env,
+        text=True,
+    )
+    import_s, total_s = (float(value) for value in output.split())
+    return import_s, total_s
+
+
+def top_imports(module, env, count):
+    """Slowest modules by cumulative import time, from one -X importtime run"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 1)} for us, name in rows[:count]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="client")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--with-model", action="store_true", help="also build the default model")
+    parser.add_argument("--backend", help="EMA_MODEL_BACKEND for the child interpreters")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/import-<commit>-<time>.json)")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # The real backend needs a key to be constructed; a placeholder is enough offline
+    env.setdefault("GEMINI_API_KEY", "benchmark")
+    if args.backend:
+        env["EMA_MODEL_BACKEND"] = args.backend
+
+    import_times, total_times = [], []
+    for _ in range(args.runs):
+        import_s, total_s = run_once(args.module, args.with_model, env)
+        import_times.append(import_s)
+        total_times.append(total_s)
+
+    results = {
+        "module": args.module,
+        "runs": args.runs,
+        "import_ms": {
+            "median": round(statistics.median(import_times) * 1000, 1),
+            "min": round(min(import_times) * 1000, 1),
+            "max": round(max(import_times) * 1000, 1),
+        },
+        "top_imports": top_imports(args.module, env, args.top),
+    }
+    if args.with_model:
+        results["import_and_model_ms"] = {
+            "median": round(statistics.median(total_times) * 1000, 1),
+            "min": round(min(total_times) * 1000, 1),
+            "max": round(max(total_times) * 1000, 1),
+        }
+    report = {
+        "benchmark": "import",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "results": results,
+    }
+    print(json.dumps(results, indent=2))
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"import-{report['commit']}-{int(time.time())}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Throughput benchmark for the MCP server against a local moto S3 stand-in.
+
+Starts moto in server mode and the MCP server (mcp_server/main.py) under
+uvicorn, drives /create_bucket and /apply_policy at a fixed concurrency with
+a mix of bucket options, and writes throughput and latency percentiles to a
+JSON file that can be compared with a previous run:
+
+    python benchmarks/bench_server.py --requests 2000 --concurrency 32
+    python benchmarks/bench_server.py --async-backend --compare results/old.json
+
+Server settings such as S3_RATE_LIMIT or MCP_BATCH_CONCURRENCY are passed
+through from the environment.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from _common import ROOT, git_commit, percentile
+
+
+POLICY_TEMPLATE = {
+    "Version": "2012-10-17",
+    "Statement": [
+        {
+            "Sid": "DenyInsecureTransport",
+            "Effect": "Deny",
+            "Principal": "*",
+            "Action": "s3:*",
+            "Resource": ["arn:aws:s3:::{bucket}", "arn:aws:s3:::{bucket}/*"],
+            "Condition": {"Bool": {"aws:SecureTransport": "false"}},
+        }
+    ],
+}
+PUBLIC_ACCESS_BLOCK = {
+    "BlockPublicAcls": True,
+    "IgnorePublicAcls": True,
+    "BlockPublicPolicy": True,
+    "RestrictPublicBuckets": True,
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+def start_servers(async_backend):
+    moto_port, server_port = free_port(), free_port()
+    env = dict(
+        os.environ,
+        AWS_ACCESS_KEY_ID="testing",
+        AWS_SECRET_ACCESS_KEY="testing",
+        AWS_DEFAULT_REGION="us-east-1",
+        S3_ENDPOINT_URL=f"http://127.0.0.1:{moto_port}",
+        MCP_ASYNC_BACKEND="1" if async_backend else "0",
+    )
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "moto.server", "-p", str(moto_port)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    ]
+    wait_for_port(moto_port)
+    processes.append(
+        subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--app-dir", os.path.join(ROOT, "mcp_server"),
+                "--port", str(server_port),
+                "--log-level", "warning",
+            ],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    )
+    wait_for_port(server_port)
+    return processes, f"http://127.0.0.1:{server_port}"
+
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def make_workload(count, policy_ratio, seed, existing=()):
+    """Deterministic list of (endpoint, payload) with varied bucket options
+
+    /apply_policy only targets `existing` buckets, created before the run: a
+    bucket created in the same run may still be queued when its policy request
+    is sent, which would make the error count vary between runs.
+    """
+    rng = random.Random(seed)
+    run_id = uuid.uuid4().hex[:8]
+    workload = []
+    for i in range(count):
+        if existing and rng.random() < policy_ratio:
+            bucket = rng.choice(existing)
+            policy = json.dumps(POLICY_TEMPLATE).replace("{bucket}", bucket)
+            workload.append(("/apply_policy", {"bucket_name": bucket, "policy_json": policy}))
+            continue
+        bucket = f"bench-{run_id}-{i}"
+        payload = {"bucket_name": bucket, "versioning": rng.random() < 0.5}
+        if rng.random() < 0.5:
+            payload["tags"] = {"Environment": "bench", "Index": str(i)}
+        if rng.random() < 0.5:
+            payload["public_access_block"] = PUBLIC_ACCESS_BLOCK
+        if rng.random() < 0.3:
+            payload["policy"] = json.dumps(POLICY_TEMPLATE).replace("{bucket}", bucket)
+        workload.append(("/create_bucket", payload))
+    return workload
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def run_workload(base_url, workload, concurrency):
+    local = threading.local()
+    results = {}
+    lock = threading.Lock()
+
+    def send(item):
+        endpoint, payload = item
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = local.session.post(base_url + endpoint, json=payload, timeout=60).status_code == 200
+        except requests.RequestException:
+            ok = False
+        latency = time.perf_counter() - start
+        with lock:
+            latencies, errors = results.setdefault(endpoint, ([], [0]))
+            if ok:
+                latencies.append(latency)
+            else:
+                errors[0] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, workload))
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [value for latencies, _ in results.values() for value in latencies]
+    all_errors = sum(errors[0] for _, errors in results.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "overall": summarize(all_latencies, all_errors, elapsed),
+        "endpoints": {
+            endpoint: summarize(latencies, errors[0], elapsed)
+            for endpoint, (latencies, errors) in sorted(results.items())
+        },
+    }
+
+
+def compare(current, previous):
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('timestamp')}):")
+    for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+        old, new = previous["results"]["overall"].get(key), current["results"]["overall"].get(key)
+        if old and new:
+            print(f"  {key:>15}: {old:>10} -> {new:>10} ({(new - old) / old * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--policy-ratio", type=float, default=0.2,
+                        help="share of requests sent to /apply_policy (targets the warm-up buckets)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--async-backend", action="store_true")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/server-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    processes, base_url = start_servers(args.async_backend)
+    try:
+        # Warm-up only creates buckets; they are the measured run's policy targets
+        warmup = make_workload(args.warmup, 0, args.seed + 1)
+        run_workload(base_url, warmup, args.concurrency)
+        existing = [payload["bucket_name"] for _, payload in warmup]
+        results = run_workload(
+            base_url, make_workload(args.requests, args.policy_ratio, args.seed, existing), args.concurrency
+        )
+    finally:
+        stop_servers(processes)
+
+    report = {
+        "benchmark": "mcp_server",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "results": results,
+    }
+    print(json.dumps(report["results"], indent=2))
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"server-{report['commit']}-{int(time.time())}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
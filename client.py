@@ -1,23 +1,124 @@
-import requests
 import os
 import json
-import re
+import threading
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from llm_cache import LLMCache
+from llm_metrics import LLMMetrics
+from conversation_memory import ConversationMemory
+from prefetch import Prefetcher
+from mcp_client import MCPServerClient, MCPConnectionError, MCPServerError
+from policy_templates import bucket_arns, render_policy
+from mcp_server.policy_validator import policy_errors
+from mcp_server.bucket_names import validate_bucket_name
+from intent_router import (
+    IGNORE_WORDS,
+    CONTEXT_IGNORE_WORDS,
+    bucket_name_candidates,
+    extract_tags,
+    route_message,
+)
 
 
 load_dotenv()
-os.environ["GOOGLE_API_KEY"] = os.getenv("GEMINI_API_KEY")
+if os.getenv("GEMINI_API_KEY"):
+    os.environ["GOOGLE_API_KEY"] = os.getenv("GEMINI_API_KEY")
+
+# "gemini" for the real model, "fake" for the deterministic offline model
+MODEL_BACKEND = os.getenv("EMA_MODEL_BACKEND", "gemini")
+
+
+def create_model(backend=MODEL_BACKEND):
+    """Build the chat model for a backend name"""
+    if backend == "fake":
+        from fake_model import FakeChatModel
+
+        return FakeChatModel(
+            latency=float(os.getenv("EMA_FAKE_LATENCY", "0")),
+            tokens_per_second=float(os.getenv("EMA_FAKE_TOKENS_PER_SECOND", "0")),
+        )
+    # The Gemini SDK dominates import time, so it is only loaded when a model is built
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(model="gemini-2.5-flash")
+
+
+# Built on first use by default_model(); tests may assign their own model here
+model = None
+_model_lock = threading.Lock()
+
+
+def default_model():
+    """The shared model used by assistants that were not given one"""
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                model = create_model()
+    return model
+
+
+_chain_parts = {}
+_chain_parts_lock = threading.Lock()
+
+
+def _get_chain_part(name):
+    """Build a prompt or the output parser on first use and cache it"""
+    part = _chain_parts.get(name)
+    if part is None:
+        with _chain_parts_lock:
+            part = _chain_parts.get(name)
+            if part is None:
+                if name == "output_parser":
+                    from langchain_core.output_parsers import StrOutputParser
+
+                    part = StrOutputParser()
+                else:
+                    from langchain_core.prompts import ChatPromptTemplate
+
+                    part = ChatPromptTemplate.from_messages(PROMPT_MESSAGES[name])
+                _chain_parts[name] = part
+    return part
+
+
+def __getattr__(name):
+    # Keeps client.output_parser and client.*_prompt working without eager imports
+    if name == "output_parser" or name in PROMPT_MESSAGES:
+        return _get_chain_part(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def warm_up(background=True):
+    """Load the model and chain parts ahead of the first turn"""
+
+    def load():
+        default_model()
+        _get_chain_part("output_parser")
+        for name in PROMPT_MESSAGES:
+            _get_chain_part(name)
+
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name="ema-warm-up", daemon=True)
+    thread.start()
+    return thread
 
+# Shared cache for deterministic chain calls (policy explanations and generation)
+response_cache = LLMCache.from_env()
 
-model = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
-output_parser = StrOutputParser()
+# Shared pooled connection to the MCP server (EMA_MCP_URL, default http://localhost:8000)
+server_client = MCPServerClient.from_env()
 
+# Background bucket-name availability checks, shared by all assistants
+prefetcher = Prefetcher.from_env()
+AVAILABILITY_TTL = float(os.getenv("EMA_AVAILABILITY_TTL", "60"))
+
+
+# Prompt messages, turned into templates on first use (see _get_chain_part)
+PROMPT_MESSAGES = {}
 
 # Conversational prompt for the main chatbot
-conversation_prompt = ChatPromptTemplate.from_messages(
+PROMPT_MESSAGES["conversation_prompt"] = (
     [
         (
             "system",
@@ -51,15 +152,21 @@ User's bucket configuration so far:
 - Policy: {policy}
 
 
+Summary of earlier turns:
+{summary}
+
+
 Respond naturally and conversationally. If the user wants to create the bucket, ask for confirmation and then proceed.""",
         ),
+        # The most recent turns, verbatim
+        ("placeholder", "{history}"),
         ("human", "{user_message}"),
     ]
 )
 
 
 # Policy explanation prompt
-policy_explanation_prompt = ChatPromptTemplate.from_messages(
+PROMPT_MESSAGES["policy_explanation_prompt"] = (
     [
         (
             "system",
@@ -75,7 +182,7 @@ policy_explanation_prompt = ChatPromptTemplate.from_messages(
 
 
 # Policy generation prompt
-policy_generation_prompt = ChatPromptTemplate.from_messages(
+PROMPT_MESSAGES["policy_generation_prompt"] = (
     [
         (
             "system",
@@ -85,14 +192,35 @@ policy_generation_prompt = ChatPromptTemplate.from_messages(
         ),
         (
             "human",
-            "Create an S3 bucket policy for: {requirements}. Return ONLY the JSON policy document, no other text.",
+            "Create an S3 bucket policy for: {requirements}. The bucket ARN is {bucket_arn}; every Resource must be {bucket_arn} or {bucket_arn}/*. Return ONLY the JSON policy document, no other text.",
         ),
     ]
 )
 
 
 class S3BucketAssistant:
-    def __init__(self):
+    # Fixed attribute layout keeps each hosted session small
+    __slots__ = (
+        "cache",
+        "model",
+        "server",
+        "metrics",
+        "bucket_name",
+        "versioning",
+        "tags",
+        "public_access_block",
+        "policy",
+        "context",
+        "name_confirmed",
+        "memory",
+    )
+
+    def __init__(self, cache=None, model=None, server=None):
+        self.cache = cache if cache is not None else response_cache
+        # None means the shared default model, resolved when the first chain runs
+        self.model = model
+        self.server = server if server is not None else server_client
+        self.metrics = LLMMetrics()
         self.bucket_name = None
         self.versioning = False
         self.tags = {}
@@ -100,6 +228,39 @@ class S3BucketAssistant:
         self.policy = None
         self.context = "Starting a new conversation about S3 bucket creation."
         self.name_confirmed = False  # Track if bucket name has been confirmed
+        self.memory = ConversationMemory()
+
+    # Attributes captured in a session snapshot
+    STATE_FIELDS = (
+        "bucket_name",
+        "versioning",
+        "tags",
+        "public_access_block",
+        "policy",
+        "context",
+        "name_confirmed",
+    )
+
+    def to_state(self):
+        """Serializable snapshot of the configuration and conversation context"""
+        state = {field: getattr(self, field) for field in self.STATE_FIELDS}
+        state["memory"] = self.memory.to_state()
+        return state
+
+    @classmethod
+    def from_state(cls, state, cache=None, model=None, server=None):
+        """Rebuild an assistant from a snapshot produced by to_state()"""
+        assistant = cls(cache=cache, model=model, server=server)
+        for field in cls.STATE_FIELDS:
+            if field in state:
+                setattr(assistant, field, state[field])
+        if "memory" in state:
+            assistant.memory = ConversationMemory.from_state(state["memory"])
+        return assistant
+
+    def get_metrics_summary(self):
+        """Model usage for this session: calls, cache hits, tokens and latency"""
+        return self.metrics.summary()
 
     def get_config_summary(self):
         """Get a summary of current configuration"""
@@ -116,166 +277,121 @@ class S3BucketAssistant:
 
     def validate_bucket_name(self, name):
         """Validate S3 bucket name"""
-        if not name:
-            return False, "Bucket name cannot be empty."
-
-        if len(name) < 3 or len(name) > 63:
-            return False, "Bucket name must be between 3 and 63 characters."
-
-        if not re.match(r"^[a-z0-9][a-z0-9.-]*[a-z0-9]$", name):
-            return (
-                False,
-                "Bucket name can only contain lowercase letters, numbers, dots, and hyphens. It must start and end with a letter or number.",
-            )
-
-        if name.startswith("xn--") or name.endswith("-s3alias"):
-            return False, "Bucket name cannot start with 'xn--' or end with '-s3alias'."
-
-        return True, "Valid bucket name."
+        return validate_bucket_name(name)
 
     def extract_bucket_name(self, text):
         """Extract potential bucket name from user text"""
-        # Common words to ignore when extracting bucket names
-        ignore_words = {
-            "want",
-            "create",
-            "new",
-            "bucket",
-            "the",
-            "a",
-            "an",
-            "and",
-            "or",
-            "but",
-            "is",
-            "are",
-            "was",
-            "were",
-            "be",
-            "been",
-            "being",
-            "have",
-            "has",
-            "had",
-            "do",
-            "does",
-            "did",
-            "will",
-            "would",
-            "could",
-            "should",
-            "may",
-            "might",
-            "can",
-            "must",
-            "shall",
-            "like",
-            "to",
-            "name",
-            "it",
-        }
-
-        # Look for patterns that might be bucket names
-        words = text.split()
-        for word in words:
-            # Remove punctuation and check if it looks like a bucket name
-            clean_word = re.sub(r"[^\w.-]", "", word.lower())
-
-            # Skip common words and very short words
-            if clean_word in ignore_words or len(clean_word) < 3:
-                continue
-
-            if 3 <= len(clean_word) <= 63 and re.match(
-                r"^[a-z0-9][a-z0-9.-]*[a-z0-9]$", clean_word
-            ):
-                return clean_word
-        return None
+        candidates = bucket_name_candidates(text.lower(), IGNORE_WORDS)
+        return candidates[0] if candidates else None
 
     def extract_bucket_name_from_context(self, text):
         """Extract bucket name with better context awareness"""
-        # Common words to ignore when extracting bucket names
-        ignore_words = {
-            "want",
-            "create",
-            "new",
-            "bucket",
-            "the",
-            "a",
-            "an",
-            "and",
-            "or",
-            "but",
-            "is",
-            "are",
-            "was",
-            "were",
-            "be",
-            "been",
-            "being",
-            "have",
-            "has",
-            "had",
-            "do",
-            "does",
-            "did",
-            "will",
-            "would",
-            "could",
-            "should",
-            "may",
-            "might",
-            "can",
-            "must",
-            "shall",
-            "like",
-            "to",
-            "name",
-            "it",
-            "i",
-            "am",
-            "wanting",
-            "trying",
-            "going",
-        }
-
-        # Look for the longest word that matches bucket name pattern
-        words = text.split()
-        potential_names = []
-
-        for word in words:
-            # Remove punctuation and check if it looks like a bucket name
-            clean_word = re.sub(r"[^\w.-]", "", word.lower())
+        candidates = bucket_name_candidates(text.lower(), CONTEXT_IGNORE_WORDS)
+        # Return the longest potential name (most likely to be the actual bucket name)
+        return max(candidates, key=len) if candidates else None
 
-            # Skip common words and very short words
-            if clean_word in ignore_words or len(clean_word) < 3:
-                continue
+    def extract_tags(self, text):
+        """Extract tags from user text"""
+        return extract_tags(text)
 
-            if 3 <= len(clean_word) <= 63 and re.match(
-                r"^[a-z0-9][a-z0-9.-]*[a-z0-9]$", clean_word
-            ):
-                potential_names.append(clean_word)
+    def _chain(self, prompt_name):
+        """Prompt | model | parser chain for one of the PROMPT_MESSAGES"""
+        model = self.model if self.model is not None else default_model()
+        return _get_chain_part(prompt_name) | model | _get_chain_part("output_parser")
 
-        # Return the longest potential name (most likely to be the actual bucket name)
-        if potential_names:
-            return max(potential_names, key=len)
+    def _stream_chain(self, chain, inputs, error_message, tracker, cache_namespace=None):
+        """Yield response chunks as the model produces them"""
+        chunks = []
+        try:
+            for chunk in chain.stream(inputs, config={"callbacks": [tracker]}):
+                tracker.chunk()
+                chunks.append(chunk)
+                yield chunk
+        except Exception as e:
+            tracker.finish("".join(chunks), error=e)
+            yield f"{error_message} Error: {str(e)}"
+            return
+        response = "".join(chunks)
+        tracker.finish(response)
+        if cache_namespace:
+            self.cache.set(cache_namespace, inputs, response)
+
+    def _run_chain(self, prompt_name, inputs, stream, error_message, call, cache_namespace=None):
+        """Return a chunk iterator when streaming, otherwise the full response text"""
+        if cache_namespace:
+            cached = self.cache.get(cache_namespace, inputs)
+            if cached is not None:
+                self.metrics.record(call, cache_hit=True)
+                return iter([cached]) if stream else cached
+        # Built after the cache check so cached answers never load the model
+        chain = self._chain(prompt_name)
+        tracker = self.metrics.track(call)
+        if stream:
+            return self._stream_chain(
+                chain, inputs, error_message, tracker, cache_namespace
+            )
+        try:
+            response = chain.invoke(inputs, config={"callbacks": [tracker]})
+        except Exception as e:
+            tracker.finish(error=e)
+            return f"{error_message} Error: {str(e)}"
+        tracker.finish(response)
+        if cache_namespace:
+            self.cache.set(cache_namespace, inputs, response)
+        return response
+
+    def _availability_key(self):
+        return ("availability", self.server.base_url, self.bucket_name)
+
+    def _prefetch(self):
+        """Start checking the current bucket name's availability in the background"""
+        if not self.bucket_name:
+            return
+        prefetcher.submit(
+            self._availability_key(),
+            AVAILABILITY_TTL,
+            self.server.bucket_availability,
+            self.bucket_name,
+        )
 
-        return None
+    def _name_taken(self):
+        """True if a finished background check found the name owned by another account"""
+        result = prefetcher.get(self._availability_key())
+        return bool(result) and not result["available"] and result["owned"] is False
 
-    def extract_tags(self, text):
-        """Extract tags from user text"""
-        tags = {}
-        # Look for key=value patterns
-        tag_pattern = r"(\w+)\s*=\s*([^\s,]+)"
-        matches = re.findall(tag_pattern, text)
-        for key, value in matches:
-            tags[key] = value
-        return tags
+    def _policy_errors(self, policy):
+        """Reasons the MCP server would reject a policy for the current configuration"""
+        return policy_errors(policy, self.bucket_name, self.public_access_block)
 
     def generate_policy(self, requirements):
-        """Generate policy using AI"""
+        """Generate policy from a template, falling back to AI
+
+        Returns None rather than a policy the MCP server would reject.
+        """
+        # Common patterns are filled in locally without a model round-trip
+        if self.bucket_name:
+            templated = render_policy(requirements, self.bucket_name)
+            if templated:
+                self.metrics.record("generate_policy", template_hit=True)
+                # e.g. a public-read template while public policies are blocked
+                return None if self._policy_errors(templated) else templated
+
+        inputs = {
+            "requirements": requirements,
+            "bucket_arn": bucket_arns(self.bucket_name or "example-bucket")[0],
+        }
+        # A policy is only reusable for the same bucket and public access block
+        cache_inputs = {**inputs, "public_access_block": self.public_access_block}
+        cached = self.cache.get("generate_policy", cache_inputs)
+        if cached is not None and not self._policy_errors(cached):
+            self.metrics.record("generate_policy", cache_hit=True)
+            return cached
+        tracker = self.metrics.track("generate_policy")
+        response = ""
         try:
-            chain = policy_generation_prompt | model | output_parser
-            response = chain.stream({"requirements": requirements})
+            chain = self._chain("policy_generation_prompt")
+            # Collect the whole response; the JSON can only be validated once complete
+            response = chain.invoke(inputs, config={"callbacks": [tracker]})
 
             # Clean up the response
             response = response.strip()
@@ -285,26 +401,31 @@ class S3BucketAssistant:
                 response = response[:-3]
             response = response.strip()
 
-            # Validate JSON
+            # Validate JSON, then reject anything the MCP server would refuse before S3
             json.loads(response)
+            errors = self._policy_errors(response)
+            if errors:
+                raise ValueError(" ".join(errors))
+            tracker.finish(response)
+            self.cache.set("generate_policy", cache_inputs, response)
             return response
         except Exception as e:
+            tracker.finish(response, error=e)
             return None
 
-    def explain_policy(self, policy_name):
+    def explain_policy(self, policy_name, stream=False):
         """Get AI explanation of S3 policies"""
-        try:
-            chain = policy_explanation_prompt | model | output_parser
-            return chain.stream({"policy_name": policy_name})
-        except Exception as e:
-            return f"Sorry, I couldn't explain that policy right now. Error: {str(e)}"
-
-    def create_bucket(self):
-        """Create the bucket using the MCP server"""
-        if not self.bucket_name:
-            return False, "No bucket name specified."
+        return self._run_chain(
+            "policy_explanation_prompt",
+            {"policy_name": policy_name},
+            stream,
+            "Sorry, I couldn't explain that policy right now.",
+            "explain_policy",
+            cache_namespace="explain_policy",
+        )
 
-        payload = {
+    def _bucket_payload(self):
+        return {
             "bucket_name": self.bucket_name,
             "versioning": self.versioning,
             "tags": self.tags if self.tags else None,
@@ -312,45 +433,98 @@ class S3BucketAssistant:
             "policy": self.policy,
         }
 
+    def _server_error_message(self, error, action):
+        if isinstance(error, MCPConnectionError):
+            return f"❌ Could not connect to the MCP server. Make sure it's running on {self.server.base_url}"
+        if isinstance(error, MCPServerError):
+            return f"❌ Failed to {action}: {error.detail}"
+        return f"❌ An error occurred: {str(error)}"
+
+    def _taken_message(self):
+        return f"❌ Failed to create bucket: the name '{self.bucket_name}' is already taken by another AWS account."
+
+    def create_bucket(self):
+        """Create the bucket using the MCP server"""
+        if not self.bucket_name:
+            return False, "No bucket name specified."
+        if self._name_taken():
+            return False, self._taken_message()
         try:
-            resp = requests.post("http://localhost:8000/create_bucket", json=payload)
-            result = resp.json()
+            self.server.create_bucket(self._bucket_payload())
+        except Exception as e:
+            return False, self._server_error_message(e, "create bucket")
+        return True, f"✅ Bucket '{self.bucket_name}' created successfully!"
 
-            if resp.status_code == 200:
-                return True, f"✅ Bucket '{self.bucket_name}' created successfully!"
-            else:
-                return (
-                    False,
-                    f"❌ Failed to create bucket: {result.get('detail', 'Unknown error')}",
-                )
-
-        except requests.exceptions.ConnectionError:
-            return (
-                False,
-                "❌ Could not connect to the MCP server. Make sure it's running on http://localhost:8000",
-            )
+    async def acreate_bucket(self):
+        """create_bucket() without blocking the event loop"""
+        if not self.bucket_name:
+            return False, "No bucket name specified."
+        if self._name_taken():
+            return False, self._taken_message()
+        try:
+            await self.server.acreate_bucket(self._bucket_payload())
+        except Exception as e:
+            return False, self._server_error_message(e, "create bucket")
+        return True, f"✅ Bucket '{self.bucket_name}' created successfully!"
+
+    def apply_policy(self):
+        """Attach the configured policy to an existing bucket"""
+        if not self.bucket_name or not self.policy:
+            return False, "A bucket name and a policy are needed to apply a policy."
+        try:
+            self.server.apply_policy(self.bucket_name, self.policy)
         except Exception as e:
-            return False, f"❌ An error occurred: {str(e)}"
+            return False, self._server_error_message(e, "apply policy")
+        return True, f"✅ Policy applied to bucket '{self.bucket_name}'!"
 
-    def chat(self, user_message):
-        """Process user message and return response"""
-        user_lower = user_message.lower()
+    async def aapply_policy(self):
+        """apply_policy() without blocking the event loop"""
+        if not self.bucket_name or not self.policy:
+            return False, "A bucket name and a policy are needed to apply a policy."
+        try:
+            await self.server.aapply_policy(self.bucket_name, self.policy)
+        except Exception as e:
+            return False, self._server_error_message(e, "apply policy")
+        return True, f"✅ Policy applied to bucket '{self.bucket_name}'!"
+
+    def chat(self, user_message, stream=False):
+        """Process user message and return response
+
+        With stream=True an iterator of text chunks is returned so callers can
+        render the reply as it arrives; otherwise the complete text is returned.
+        """
+        chain_calls = self.metrics.chain_calls
+        bucket_name = self.bucket_name
+        response = self._chat(user_message, stream)
+        self.metrics.record_turn(self.metrics.chain_calls != chain_calls)
+        if self.bucket_name != bucket_name:
+            # Check the new name while the user reads the reply
+            self._prefetch()
+        if stream:
+            if isinstance(response, str):
+                response = iter([response])
+            return self._remember_stream(user_message, response)
+        self.memory.add(user_message, response)
+        return response
+
+    def _remember_stream(self, user_message, chunks):
+        """Pass chunks through, adding the turn to memory once the reply is complete"""
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        self.memory.add(user_message, "".join(parts))
+
+    def _chat(self, user_message, stream):
+        route = route_message(user_message)
+        intents = route.intents
 
         # If no bucket name is set yet, ask for it explicitly
         if not self.bucket_name and not self.name_confirmed:
             # Look for explicit bucket name mentions
-            if any(
-                phrase in user_lower
-                for phrase in [
-                    "bucket name",
-                    "call it",
-                    "name it",
-                    "named",
-                    "like to name",
-                ]
-            ):
+            if "name_mention" in intents:
                 # Try to extract a bucket name from the message
-                bucket_name = self.extract_bucket_name_from_context(user_message)
+                bucket_name = route.bucket_name
                 if bucket_name:
                     is_valid, message = self.validate_bucket_name(bucket_name)
                     if is_valid:
@@ -366,20 +540,15 @@ class S3BucketAssistant:
         # Handle bucket name confirmation if not confirmed yet
         if self.bucket_name and not self.name_confirmed:
             # If user confirms the name or provides a new one
-            if any(
-                word in user_lower
-                for word in ["yes", "correct", "right", "good", "ok", "sure"]
-            ):
+            if "affirm" in intents:
                 self.name_confirmed = True
                 return f"Great! The bucket name is confirmed as '{self.bucket_name}'. What would you like to configure next?"
-            elif any(
-                word in user_lower for word in ["no", "wrong", "change", "different"]
-            ):
+            elif "deny" in intents:
                 self.bucket_name = None
                 return "No problem! What would you like to name your bucket instead?"
             else:
                 # Try to extract a new bucket name
-                bucket_name = self.extract_bucket_name_from_context(user_message)
+                bucket_name = route.bucket_name
                 if bucket_name:
                     is_valid, message = self.validate_bucket_name(bucket_name)
                     if is_valid:
@@ -390,12 +559,9 @@ class S3BucketAssistant:
                         return f"I see '{bucket_name}' as a potential bucket name, but {message} Could you suggest a different name?"
 
         # Handle explicit bucket name changes (only if name is already confirmed)
-        if self.name_confirmed and any(
-            phrase in user_lower
-            for phrase in ["change name", "rename", "different name", "should be"]
-        ):
+        if self.name_confirmed and "rename" in intents:
             # Extract potential new name
-            bucket_name = self.extract_bucket_name_from_context(user_message)
+            bucket_name = route.bucket_name
             if bucket_name:
                 is_valid, message = self.validate_bucket_name(bucket_name)
                 if is_valid:
@@ -406,24 +572,24 @@ class S3BucketAssistant:
                     return f"I see '{bucket_name}' as a potential bucket name, but {message} Could you suggest a different name?"
 
         # Extract tags if mentioned
-        if "tag" in user_lower or "=" in user_message:
-            new_tags = self.extract_tags(user_message)
+        if "tag" in intents or "assign" in intents:
+            new_tags = route.tags
             if new_tags:
                 self.tags.update(new_tags)
                 return f"Great! I've added the tags: {new_tags}. What else would you like to configure?"
 
         # Handle versioning
-        if any(word in user_lower for word in ["version", "versioning"]):
-            if "enable" in user_lower or "yes" in user_lower or "on" in user_lower:
+        if "version" in intents:
+            if "enable" in intents:
                 self.versioning = True
                 return "Perfect! I've enabled versioning for your bucket. This will help protect against accidental deletions and overwrites. What else would you like to configure?"
-            elif "disable" in user_lower or "no" in user_lower or "off" in user_lower:
+            elif "disable" in intents:
                 self.versioning = False
                 return "Got it! Versioning will remain disabled. What else would you like to configure?"
 
         # Handle public access
-        if "public" in user_lower and "access" in user_lower:
-            if "block" in user_lower or "restrict" in user_lower:
+        if "public" in intents and "access" in intents:
+            if "block" in intents:
                 self.public_access_block = {
                     "BlockPublicAcls": True,
                     "IgnorePublicAcls": True,
@@ -433,27 +599,21 @@ class S3BucketAssistant:
                 return "Excellent! I've configured the public access block settings to keep your bucket secure. What else would you like to configure?"
 
         # Handle policy requests
-        if "policy" in user_lower:
-            if "explain" in user_lower or "what" in user_lower:
-                policy_words = [
-                    "block public",
-                    "read only",
-                    "write",
-                    "cross account",
-                    "cloudfront",
-                ]
-                for policy in policy_words:
-                    if policy in user_lower:
-                        return self.explain_policy(policy.title())
+        if "policy" in intents:
+            if "explain" in intents:
+                if route.policy_topic:
+                    return self.explain_policy(route.policy_topic.title(), stream=stream)
                 return "I can explain various S3 policies like 'Block Public Access', 'Read Only Access', 'Write Access', etc. Which one would you like me to explain?"
 
         # Handle bucket creation
-        if any(
-            word in user_lower
-            for word in ["create", "make", "build", "set up", "ready", "done", "finish"]
-        ):
+        if "create" in intents:
             if not self.bucket_name or not self.name_confirmed:
                 return "I need to confirm your bucket name first. What would you like to name your bucket?"
+            if self._name_taken():
+                taken = self.bucket_name
+                self.bucket_name = None
+                self.name_confirmed = False
+                return f"Unfortunately the bucket name '{taken}' is already taken by another AWS account. What would you like to name your bucket instead?"
 
             summary = self.get_config_summary()
             response = f"Perfect! I'm ready to create your bucket. Here's what I have configured:\n"
@@ -463,32 +623,31 @@ class S3BucketAssistant:
             return response
 
         # Handle general questions about tags
-        if "tag" in user_lower and ("what" in user_lower or "explain" in user_lower):
+        if "tag" in intents and "explain" in intents:
             return """Tags are key-value pairs you can attach to your S3 bucket for organization and cost tracking.
            Examples: Environment=Production, Project=MyApp, Owner=TeamA
            Would you like to add some tags to your bucket?"""
 
         # Generate AI response for other queries
-        try:
-            chain = conversation_prompt | model | output_parser
-            response = chain.stream(
-                {
-                    "context": self.context,
-                    "bucket_name": self.bucket_name or "Not set",
-                    "versioning": "Enabled" if self.versioning else "Disabled",
-                    "tags": str(self.tags) if self.tags else "None",
-                    "public_access_block": (
-                        "Configured" if self.public_access_block else "Default"
-                    ),
-                    "policy": "Attached" if self.policy else "None",
-                    "user_message": user_message,
-                }
-            )
-            return response
-        except Exception as e:
-            return (
-                f"Sorry, I'm having trouble processing that right now. Error: {str(e)}"
-            )
+        return self._run_chain(
+            "conversation_prompt",
+            {
+                "context": self.context,
+                "bucket_name": self.bucket_name or "Not set",
+                "versioning": "Enabled" if self.versioning else "Disabled",
+                "tags": str(self.tags) if self.tags else "None",
+                "public_access_block": (
+                    "Configured" if self.public_access_block else "Default"
+                ),
+                "policy": "Attached" if self.policy else "None",
+                "summary": self.memory.summary_text(),
+                "history": self.memory.messages(),
+                "user_message": user_message,
+            },
+            stream,
+            "Sorry, I'm having trouble processing that right now.",
+            "chat",
+        )
 
 
 def main():
@@ -502,6 +661,8 @@ def main():
     print("Type 'quit' or 'exit' to end our conversation.")
     print("=" * 60)
 
+    # Load the model while the user types their first message
+    warm_up()
     assistant = S3BucketAssistant()
 
     while True:
@@ -515,8 +676,14 @@ def main():
             if not user_input:
                 continue
 
-            response = assistant.chat(user_input)
-            print(f"\nEma: {response}")
+            # Print tokens as they arrive, keeping the full text for the checks below
+            print("\nEma: ", end="", flush=True)
+            chunks = []
+            for chunk in assistant.chat(user_input, stream=True):
+                print(chunk, end="", flush=True)
+                chunks.append(chunk)
+            print()
+            response = "".join(chunks)
 
             # Check if user wants to create the bucket
             if "Should I go ahead and create the bucket?" in response:
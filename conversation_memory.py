@@ -0,0 +1,84 @@
+import os
+import re
+from llm_metrics import estimate_tokens
+
+
+# Token budgets for the verbatim recent turns and for the summary of older ones
+RECENT_TOKENS = int(os.getenv("EMA_MEMORY_RECENT_TOKENS", "600"))
+SUMMARY_TOKENS = int(os.getenv("EMA_MEMORY_SUMMARY_TOKENS", "200"))
+
+GIST_CHARS = 80
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def clip(text, limit):
+    """Cut text to at most `limit` characters"""
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def gist(user_message, reply):
+    """One summary line for a turn: the user's message and the first sentence of the reply"""
+    user_message = " ".join(user_message.split())
+    first_sentence = SENTENCE_END.split(" ".join(reply.split()), 1)[0]
+    return f"User: {clip(user_message, GIST_CHARS)} / Ema: {clip(first_sentence, GIST_CHARS)}"
+
+
+class ConversationMemory:
+    """Token-bounded chat history for the conversation prompt
+
+    The latest turns are kept verbatim within `recent_tokens`. Older turns are
+    folded, one at a time as they age out, into a running summary of one-line
+    gists capped at `summary_tokens` by dropping its oldest lines. Prompt
+    size therefore stops growing after the first few turns of a session.
+    """
+
+    __slots__ = ("recent_tokens", "summary_tokens", "turns", "turn_tokens", "summary", "summary_size")
+
+    def __init__(self, recent_tokens=RECENT_TOKENS, summary_tokens=SUMMARY_TOKENS):
+        self.recent_tokens = recent_tokens
+        self.summary_tokens = summary_tokens
+        self.turns = []  # [user_message, reply, tokens]
+        self.turn_tokens = 0
+        self.summary = []
+        self.summary_size = 0
+
+    def add(self, user_message, reply):
+        # A single turn may use at most the whole recent budget
+        limit = self.recent_tokens * 2
+        user_message, reply = clip(user_message, limit), clip(reply, limit)
+        tokens = estimate_tokens(user_message) + estimate_tokens(reply)
+        self.turns.append([user_message, reply, tokens])
+        self.turn_tokens += tokens
+        while self.turn_tokens > self.recent_tokens and len(self.turns) > 1:
+            self._summarize(*self.turns.pop(0))
+
+    def _summarize(self, user_message, reply, tokens):
+        self.turn_tokens -= tokens
+        line = gist(user_message, reply)
+        self.summary.append(line)
+        self.summary_size += estimate_tokens(line)
+        while self.summary_size > self.summary_tokens and len(self.summary) > 1:
+            self.summary_size -= estimate_tokens(self.summary.pop(0))
+
+    def messages(self):
+        """Recent turns as (role, text) pairs for a chat prompt placeholder"""
+        history = []
+        for user_message, reply, _ in self.turns:
+            history.append(("human", user_message))
+            history.append(("ai", reply))
+        return history
+
+    def summary_text(self):
+        return "\n".join(self.summary) if self.summary else "None"
+
+    def to_state(self):
+        return {"turns": [turn[:2] for turn in self.turns], "summary": list(self.summary)}
+
+    @classmethod
+    def from_state(cls, state, **budgets):
+        memory = cls(**budgets)
+        memory.summary = list(state.get("summary", []))
+        memory.summary_size = sum(estimate_tokens(line) for line in memory.summary)
+        for user_message, reply in state.get("turns", []):
+            memory.add(user_message, reply)
+        return memory
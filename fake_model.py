@@ -0,0 +1,101 @@
+import json
+import re
+import time
+import zlib
+from typing import List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+DEFAULT_RESPONSES = [
+    "S3 buckets store objects in a flat namespace. Would you like to enable versioning or add some tags next?",
+    "Good question! Blocking public access is the safest default for most buckets. Shall I configure that for you?",
+    "Versioning keeps every version of an object so you can recover from accidental deletes and overwrites.",
+    "Tags such as Environment=Production help with cost allocation and organization. Want to add a few?",
+    "A bucket policy controls who can access the bucket and how. I can explain common policies if you like.",
+]
+
+POLICY_RESPONSE = json.dumps(
+    {
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Sid": "DenyInsecureTransport",
+                "Effect": "Deny",
+                "Principal": "*",
+                "Action": "s3:*",
+                "Resource": ["arn:aws:s3:::example-bucket", "arn:aws:s3:::example-bucket/*"],
+                "Condition": {"Bool": {"aws:SecureTransport": "false"}},
+            }
+        ],
+    }
+)
+EXAMPLE_BUCKET_ARN = "arn:aws:s3:::example-bucket"
+BUCKET_ARN_PATTERN = re.compile(r"arn:aws:s3:::[a-z0-9.-]*[a-z0-9]")
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic offline chat model for tests and benchmarks
+
+    The reply is chosen from `responses` by a hash of the last message, so the
+    same conversation always produces the same output. Policy-generation
+    prompts get a valid JSON policy for the bucket ARN in the prompt.
+    `latency` delays the first token and `tokens_per_second` paces the rest
+    (0 means instant).
+    """
+
+    responses: List[str] = DEFAULT_RESPONSES
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "fake-ema"
+
+    def _reply(self, messages):
+        system = " ".join(str(m.content) for m in messages if m.type == "system")
+        last = str(messages[-1].content) if messages else ""
+        if "ONLY valid JSON" in system:
+            match = BUCKET_ARN_PATTERN.search(last)
+            return POLICY_RESPONSE.replace(EXAMPLE_BUCKET_ARN, match.group() if match else EXAMPLE_BUCKET_ARN)
+        return self.responses[zlib.crc32(last.encode()) % len(self.responses)]
+
+    def _usage(self, messages, tokens):
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": len(tokens),
+            "total_tokens": input_tokens + len(tokens),
+        }
+
+    @staticmethod
+    def _tokens(text):
+        # Word-sized tokens that reassemble to the exact reply text
+        words = text.split(" ")
+        return [word + " " for word in words[:-1]] + [words[-1]]
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        text = self._reply(messages)
+        tokens = self._tokens(text)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.tokens_per_second:
+            time.sleep(len(tokens) / self.tokens_per_second)
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, tokens))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs):
+        tokens = self._tokens(self._reply(messages))
+        if self.latency:
+            time.sleep(self.latency)
+        for i, token in enumerate(tokens):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            usage = self._usage(messages, tokens) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(content=token, usage_metadata=usage)
+            )
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,156 @@
+import re
+from mcp_server.bucket_names import has_bucket_name_shape
+
+
+NON_NAME_CHARS = re.compile(r"[^\w.-]")
+TAG_PATTERN = re.compile(r"(\w+)\s*=\s*([^\s,]+)")
+
+# Common words to ignore when extracting bucket names
+IGNORE_WORDS = frozenset(
+    {
+        "want",
+        "create",
+        "new",
+        "bucket",
+        "the",
+        "a",
+        "an",
+        "and",
+        "or",
+        "but",
+        "is",
+        "are",
+        "was",
+        "were",
+        "be",
+        "been",
+        "being",
+        "have",
+        "has",
+        "had",
+        "do",
+        "does",
+        "did",
+        "will",
+        "would",
+        "could",
+        "should",
+        "may",
+        "might",
+        "can",
+        "must",
+        "shall",
+        "like",
+        "to",
+        "name",
+        "it",
+    }
+)
+CONTEXT_IGNORE_WORDS = IGNORE_WORDS | {"i", "am", "wanting", "trying", "going"}
+
+# Intent -> phrases that signal it (substring match on the lowercased message)
+INTENT_KEYWORDS = {
+    "name_mention": ("bucket name", "call it", "name it", "named", "like to name"),
+    "affirm": ("yes", "correct", "right", "good", "ok", "sure"),
+    "deny": ("no", "wrong", "change", "different"),
+    "rename": ("change name", "rename", "different name", "should be"),
+    "tag": ("tag",),
+    "assign": ("=",),
+    "version": ("version",),
+    "enable": ("enable", "yes", "on"),
+    "disable": ("disable", "no", "off"),
+    "public": ("public",),
+    "access": ("access",),
+    "block": ("block", "restrict"),
+    "policy": ("policy",),
+    "explain": ("explain", "what"),
+    "create": ("create", "make", "build", "set up", "ready", "done", "finish"),
+}
+
+# Policies the assistant can explain, in priority order
+POLICY_TOPICS = ("block public", "read only", "write", "cross account", "cloudfront")
+
+KEYWORD_INTENTS = {}
+for _intent, _keywords in INTENT_KEYWORDS.items():
+    for _keyword in _keywords:
+        KEYWORD_INTENTS.setdefault(_keyword, set()).add(_intent)
+KEYWORDS = sorted(set(KEYWORD_INTENTS) | set(POLICY_TOPICS), key=len, reverse=True)
+
+# A zero-width lookahead reports every position where some keyword starts, so
+# overlapping keywords are found in one scan. Alternatives are tried longest
+# first; shorter keywords that are prefixes of the match are added from PREFIXES.
+KEYWORD_PATTERN = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword in KEYWORDS) + "))"
+)
+PREFIXES = {
+    keyword: frozenset(other for other in KEYWORDS if keyword.startswith(other))
+    for keyword in KEYWORDS
+}
+
+
+def find_keywords(text_lower):
+    """Return every keyword occurring anywhere in the text"""
+    found = set()
+    for match in KEYWORD_PATTERN.finditer(text_lower):
+        found |= PREFIXES[match.group(1)]
+    return found
+
+
+def is_bucket_name(word):
+    return has_bucket_name_shape(word)
+
+
+def bucket_name_candidates(text_lower, ignore_words):
+    """Words that look like bucket names, in order of appearance"""
+    candidates = []
+    for word in text_lower.split():
+        # Remove punctuation and check if it looks like a bucket name
+        clean_word = NON_NAME_CHARS.sub("", word)
+        if clean_word in ignore_words or len(clean_word) < 3:
+            continue
+        if is_bucket_name(clean_word):
+            candidates.append(clean_word)
+    return candidates
+
+
+def extract_tags(text):
+    """Extract key=value tags from text"""
+    return dict(TAG_PATTERN.findall(text))
+
+
+class Route:
+    """Intents and entities detected in a single user message"""
+
+    __slots__ = ("intents", "keywords", "bucket_name", "tags", "policy_topic")
+
+    def __init__(self, intents, keywords, bucket_name, tags, policy_topic):
+        self.intents = intents
+        self.keywords = keywords
+        self.bucket_name = bucket_name
+        self.tags = tags
+        self.policy_topic = policy_topic
+
+    def __repr__(self):
+        return (
+            f"Route(intents={sorted(self.intents)}, bucket_name={self.bucket_name!r}, "
+            f"tags={self.tags}, policy_topic={self.policy_topic!r})"
+        )
+
+
+def route_message(text):
+    """Detect all intents and entities in one pass over the message"""
+    text_lower = text.lower()
+    keywords = find_keywords(text_lower)
+    intents = set()
+    for keyword in keywords:
+        intents.update(KEYWORD_INTENTS.get(keyword, ()))
+    candidates = bucket_name_candidates(text_lower, CONTEXT_IGNORE_WORDS)
+    policy_topic = next((topic for topic in POLICY_TOPICS if topic in keywords), None)
+    return Route(
+        intents,
+        keywords,
+        # The longest candidate is most likely to be the actual bucket name
+        max(candidates, key=len) if candidates else None,
+        extract_tags(text) if "tag" in intents or "assign" in intents else {},
+        policy_topic,
+    )
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_inputs(inputs):
+    """Collapse whitespace in string inputs so trivially different prompts share a key"""
+    return {
+        key: " ".join(value.split()) if isinstance(value, str) else value
+        for key, value in inputs.items()
+    }
+
+
+def cache_key(namespace, inputs):
+    """Stable key for a chain call"""
+    payload = json.dumps(
+        [namespace, normalize_inputs(inputs)], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries=1024, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires=None):
+        with self._lock:
+            self._entries[key] = (expires or time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """On-disk store that survives restarts, bounded by TTL and entry count"""
+
+    def __init__(self, path, max_entries=10000, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)"
+        )
+        self._conn.commit()
+
+    def get_entry(self, key):
+        """Return (expires, value) or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires = row
+            if expires < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            return expires, value
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry[1] if entry else None
+
+    def set(self, key, value, expires=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires, accessed) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, expires or now + self.ttl, now),
+            )
+            # Evict expired rows first, then the least recently used overflow
+            self._conn.execute("DELETE FROM llm_cache WHERE expires < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LLMCache:
+    """Response cache for prompt | model | output_parser chains
+
+    Lookups go to the in-memory LRU first and fall back to the optional
+    SQLite store, promoting disk hits into memory.
+    """
+
+    def __init__(self, memory=None, disk=None):
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        ttl = float(os.getenv("EMA_CACHE_TTL", "86400"))
+        memory = MemoryCache(int(os.getenv("EMA_CACHE_MAX_ENTRIES", "1024")), ttl)
+        path = os.getenv("EMA_CACHE_PATH")
+        disk = (
+            SQLiteCache(path, int(os.getenv("EMA_CACHE_DISK_MAX_ENTRIES", "10000")), ttl)
+            if path
+            else None
+        )
+        return cls(memory, disk)
+
+    def get(self, namespace, inputs):
+        key = cache_key(namespace, inputs)
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            entry = self.disk.get_entry(key)
+            if entry is not None:
+                expires, value = entry
+                self.memory.set(key, value, expires)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, namespace, inputs, value):
+        key = cache_key(namespace, inputs)
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
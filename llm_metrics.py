@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import time
+from functools import lru_cache
+
+
+logger = logging.getLogger("ema.llm")
+
+# Optional local sink: one JSON line per model call
+if os.getenv("EMA_LLM_METRICS_PATH"):
+    _handler = logging.FileHandler(os.getenv("EMA_LLM_METRICS_PATH"))
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+
+def tokens_for_chars(chars):
+    """Rough token count for `chars` characters of text"""
+    return max(1, chars // 4) if chars else 0
+
+
+def estimate_tokens(text):
+    """Rough token count for models that do not report usage"""
+    return tokens_for_chars(len(text)) if text else 0
+
+
+class LLMCallTracker:
+    """Callback handler timing one chain call and collecting its token usage
+
+    Used through tracker_class(), which adds the langchain base class on first use.
+    """
+
+    def __init__(self, metrics, call):
+        self.metrics = metrics
+        self.call = call
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.prompt_chars = 0
+        self.input_tokens = None
+        self.output_tokens = None
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.prompt_chars = sum(
+            len(str(message.content)) for batch in messages for message in batch
+        )
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.prompt_chars = sum(len(prompt) for prompt in prompts)
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    self.input_tokens = (self.input_tokens or 0) + usage.get("input_tokens", 0)
+                    self.output_tokens = (self.output_tokens or 0) + usage.get("output_tokens", 0)
+
+    def chunk(self):
+        """Mark a streamed chunk; the first one sets time-to-first-token"""
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def finish(self, output="", error=None):
+        finished = time.perf_counter()
+        latency = finished - self.started
+        usage_reported = self.input_tokens is not None
+        self.metrics.record(
+            call=self.call,
+            cache_hit=False,
+            ttft=(self.first_token or finished) - self.started,
+            latency=latency,
+            input_tokens=(
+                self.input_tokens if usage_reported else tokens_for_chars(self.prompt_chars)
+            ),
+            output_tokens=(
+                self.output_tokens if usage_reported else estimate_tokens(output)
+            ),
+            usage_reported=usage_reported,
+            error=str(error) if error else None,
+        )
+
+
+@lru_cache(maxsize=None)
+def tracker_class():
+    """LLMCallTracker combined with langchain's BaseCallbackHandler
+
+    Built lazily so importing this module does not import langchain_core.
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    return type("LLMCallTracker", (LLMCallTracker, BaseCallbackHandler), {})
+
+
+class LLMMetrics:
+    """Aggregated model-call accounting for one assistant session
+
+    Every call is also emitted as a JSON record on the "ema.llm" logger.
+    """
+
+    __slots__ = (
+        "turns",
+        "rule_turns",
+        "chain_calls",
+        "model_calls",
+        "cache_hits",
+        "template_hits",
+        "errors",
+        "input_tokens",
+        "output_tokens",
+        "latency",
+        "ttft",
+    )
+
+    def __init__(self):
+        self.turns = 0
+        self.rule_turns = 0
+        self.chain_calls = 0
+        self.model_calls = 0
+        self.cache_hits = 0
+        self.template_hits = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.latency = 0.0
+        self.ttft = 0.0
+
+    def track(self, call):
+        self.chain_calls += 1
+        return tracker_class()(self, call)
+
+    def record(self, call, cache_hit=False, template_hit=False, **fields):
+        if cache_hit or template_hit:
+            self.chain_calls += 1
+            self.cache_hits += cache_hit
+            self.template_hits += template_hit
+        else:
+            self.model_calls += 1
+            self.errors += fields.get("error") is not None
+            self.input_tokens += fields.get("input_tokens", 0)
+            self.output_tokens += fields.get("output_tokens", 0)
+            self.latency += fields.get("latency", 0.0)
+            self.ttft += fields.get("ttft", 0.0)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                json.dumps(
+                    {"call": call, "cache_hit": cache_hit, "template_hit": template_hit, **fields}
+                )
+            )
+
+    def record_turn(self, used_chain):
+        self.turns += 1
+        self.rule_turns += not used_chain
+
+    def summary(self):
+        return {
+            "turns": self.turns,
+            "rule_turns": self.rule_turns,
+            "model_calls": self.model_calls,
+            "cache_hits": self.cache_hits,
+            "template_hits": self.template_hits,
+            "errors": self.errors,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_latency": round(self.latency, 4),
+            "avg_latency": round(self.latency / self.model_calls, 4) if self.model_calls else 0.0,
+            "avg_ttft": round(self.ttft / self.model_calls, 4) if self.model_calls else 0.0,
+        }
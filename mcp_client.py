@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import threading
+
+
+class MCPServerError(Exception):
+    """The MCP server answered a request with an error"""
+
+    def __init__(self, detail, status_code=None):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class MCPConnectionError(MCPServerError):
+    """The MCP server could not be reached"""
+
+
+def idempotency_key(payload):
+    """Same payload -> same key, so retries and double-submits are deduplicated server-side"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+class MCPServerClient:
+    """Pooled keep-alive client for the MCP server's bucket endpoints
+
+    Meant to be shared by many assistants: the sync methods reuse one
+    connection pool across threads, and the async methods (prefixed with "a")
+    one pool on the event loop that first uses them. httpx is imported on
+    first use to keep startup fast.
+    """
+
+    def __init__(self, base_url="http://localhost:8000", connect_timeout=3.0, timeout=60.0, max_connections=20):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            base_url=os.getenv("EMA_MCP_URL", "http://localhost:8000"),
+            connect_timeout=float(os.getenv("EMA_MCP_CONNECT_TIMEOUT", "3")),
+            timeout=float(os.getenv("EMA_MCP_TIMEOUT", "60")),
+            max_connections=int(os.getenv("EMA_MCP_MAX_CONNECTIONS", "20")),
+        )
+
+    def _client_options(self):
+        import httpx
+
+        return {
+            "base_url": self.base_url,
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+        }
+
+    def _sync_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+
+                    self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            import httpx
+
+            self._async_client = httpx.AsyncClient(**self._client_options())
+        return self._async_client
+
+    def _request_error(self, error):
+        import httpx
+
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            return MCPConnectionError(f"Could not connect to the MCP server at {self.base_url}: {error}")
+        if isinstance(error, httpx.TimeoutException):
+            return MCPServerError(f"The MCP server did not respond within {self.timeout}s.")
+        return MCPServerError(str(error) or type(error).__name__)
+
+    @staticmethod
+    def _result(response):
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code != 200:
+            raise MCPServerError(body.get("detail", "Unknown error"), response.status_code)
+        return body.get("result")
+
+    def post(self, path, payload, key=None):
+        """POST a payload with an Idempotency-Key and return the endpoint's result"""
+        import httpx
+
+        headers = {"Idempotency-Key": key or idempotency_key(payload)}
+        try:
+            response = self._sync_client().post(path, json=payload, headers=headers)
+        except httpx.HTTPError as e:
+            raise self._request_error(e) from e
+        return self._result(response)
+
+    async def apost(self, path, payload, key=None):
+        import httpx
+
+        headers = {"Idempotency-Key": key or idempotency_key(payload)}
+        try:
+            response = await self._get_async_client().post(path, json=payload, headers=headers)
+        except httpx.HTTPError as e:
+            raise self._request_error(e) from e
+        return self._result(response)
+
+    def get(self, path, params):
+        import httpx
+
+        try:
+            response = self._sync_client().get(path, params=params)
+        except httpx.HTTPError as e:
+            raise self._request_error(e) from e
+        return self._result(response)
+
+    async def aget(self, path, params):
+        import httpx
+
+        try:
+            response = await self._get_async_client().get(path, params=params)
+        except httpx.HTTPError as e:
+            raise self._request_error(e) from e
+        return self._result(response)
+
+    def bucket_availability(self, bucket_name):
+        """{"available", "owned"} for a name, from a HeadBucket on the server"""
+        return self.get("/bucket_availability", {"bucket_name": bucket_name})
+
+    async def abucket_availability(self, bucket_name):
+        return await self.aget("/bucket_availability", {"bucket_name": bucket_name})
+
+    def create_bucket(self, payload, key=None):
+        return self.post("/create_bucket", payload, key)
+
+    async def acreate_bucket(self, payload, key=None):
+        return await self.apost("/create_bucket", payload, key)
+
+    def apply_policy(self, bucket_name, policy_json, key=None):
+        return self.post("/apply_policy", {"bucket_name": bucket_name, "policy_json": policy_json}, key)
+
+    async def aapply_policy(self, bucket_name, policy_json, key=None):
+        return await self.apost(
+            "/apply_policy", {"bucket_name": bucket_name, "policy_json": policy_json}, key
+        )
+
+    def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self):
+        client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.aclose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+        self.close()
@@ -0,0 +1,223 @@
+import asyncio
+import time
+from aiobotocore.config import AioConfig
+from aiobotocore.session import AioSession
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+from metrics import span
+from aws_tools import (
+    MAX_POOL_CONNECTIONS, rate_limiter, target_limiter, client_key, location_constraint, cached_bucket_state,
+    store_bucket_state, invalidate_bucket_state, plan_changes, apply_changes_to_state, validate_policy,
+    _availability_from_error, _error_code
+)
+load_dotenv()
+
+# Async counterparts of the aws_tools operations. Clients are cached per
+# (region, profile, access key, secret key, endpoint) for the lifetime of the
+# event loop, and share the per-target limiters of aws_tools.
+_clients = {}
+_client_limiters = {}
+_clients_lock = None
+
+async def s3_call(fn, **kwargs):
+    limiter = _client_limiters.get(getattr(fn, '__self__', None), rate_limiter)
+    with span(fn.__name__):
+        return await limiter.call_async(fn, **kwargs)
+
+async def get_s3_client(region=None, profile=None):
+    global _clients_lock
+    key = client_key(region, profile)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    if _clients_lock is None:
+        _clients_lock = asyncio.Lock()
+    async with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            region, profile, access_key, secret_key, endpoint_url = key
+            with span('create_client'):
+                client = await AioSession(profile=profile).create_client(
+                    's3',
+                    region_name=region,
+                    aws_access_key_id=access_key,
+                    aws_secret_access_key=secret_key,
+                    endpoint_url=endpoint_url,
+                    config=AioConfig(
+                        max_pool_connections=MAX_POOL_CONNECTIONS,
+                        tcp_keepalive=True,
+                        retries={'total_max_attempts': 1}
+                    )
+                ).__aenter__()
+            _client_limiters[client] = target_limiter(region, profile)
+            _clients[key] = client
+        return client
+
+async def close_s3_clients():
+    clients = list(_clients.values())
+    _clients.clear()
+    _client_limiters.clear()
+    for client in clients:
+        await client.close()
+
+async def _timed(report, name, coro):
+    start = time.perf_counter()
+    try:
+        output = await coro
+    except Exception as e:
+        report[name] = {'status': 'error', 'seconds': round(time.perf_counter() - start, 4), 'error': str(e)}
+        raise
+    report[name] = {'status': 'ok', 'seconds': round(time.perf_counter() - start, 4)}
+    return output
+
+async def _read_tags(s3, bucket_name):
+    try:
+        tag_set = (await s3_call(s3.get_bucket_tagging, Bucket=bucket_name))['TagSet']
+    except ClientError as e:
+        if _error_code(e) == 'NoSuchTagSet':
+            return {}
+        raise
+    return {tag['Key']: tag['Value'] for tag in tag_set}
+
+async def _read_versioning(s3, bucket_name):
+    return (await s3_call(s3.get_bucket_versioning, Bucket=bucket_name)).get('Status')
+
+async def _read_public_access_block(s3, bucket_name):
+    try:
+        return (await s3_call(s3.get_public_access_block, Bucket=bucket_name))['PublicAccessBlockConfiguration']
+    except ClientError as e:
+        if _error_code(e) == 'NoSuchPublicAccessBlockConfiguration':
+            return None
+        raise
+
+async def _read_policy(s3, bucket_name):
+    try:
+        return (await s3_call(s3.get_bucket_policy, Bucket=bucket_name))['Policy']
+    except ClientError as e:
+        if _error_code(e) == 'NoSuchBucketPolicy':
+            return None
+        raise
+
+async def get_bucket_state(bucket_name, use_cache=True, region=None, profile=None):
+    if use_cache:
+        state = cached_bucket_state(bucket_name)
+        if state is not None:
+            return state
+    s3 = await get_s3_client(region, profile)
+    names = ('tags', 'versioning', 'public_access_block', 'policy')
+    outputs = await asyncio.gather(
+        _read_tags(s3, bucket_name),
+        _read_versioning(s3, bucket_name),
+        _read_public_access_block(s3, bucket_name),
+        _read_policy(s3, bucket_name),
+        return_exceptions=True
+    )
+    errors = [output for output in outputs if isinstance(output, Exception)]
+    for error in errors:
+        if isinstance(error, ClientError) and _error_code(error) == 'NoSuchBucket':
+            invalidate_bucket_state(bucket_name)
+            return None
+    for error in errors:
+        raise error
+    state = dict(zip(names, outputs))
+    store_bucket_state(bucket_name, state)
+    return state
+
+async def create_bucket_with_options(bucket_name, versioning, tags=None, public_access_block=None, policy=None, reconcile=False,
+                                     region=None, profile=None):
+    if policy:
+        validate_policy(policy, bucket_name, public_access_block, 'create_bucket')
+    s3 = await get_s3_client(region, profile)
+    report = {}
+    state = await get_bucket_state(bucket_name, region=region, profile=profile) if reconcile else None
+    if state is not None:
+        changes = plan_changes(state, versioning, tags, public_access_block, policy)
+        unchanged = [name for name, wanted in (
+            ('tags', tags), ('versioning', versioning), ('public_access_block', public_access_block), ('policy', policy)
+        ) if wanted and name not in changes]
+        tags = tags if 'tags' in changes else None
+        versioning = versioning if 'versioning' in changes else False
+        public_access_block = public_access_block if 'public_access_block' in changes else None
+        policy = policy if 'policy' in changes else None
+
+    async def create():
+        try:
+            await s3_call(s3.create_bucket, Bucket=bucket_name, **location_constraint(s3.meta.region_name))
+            return {'bucket_created': True}
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'BucketAlreadyOwnedByYou':
+                return {'bucket_created': False, 'message': 'Bucket already exists and is owned by you.'}
+            raise
+
+    async def put_tags():
+        await s3_call(s3.put_bucket_tagging, Bucket=bucket_name, Tagging={'TagSet': [{'Key': k, 'Value': v} for k, v in tags.items()]})
+        return {'tags_applied': True}
+
+    async def put_versioning():
+        await s3_call(s3.put_bucket_versioning, Bucket=bucket_name, VersioningConfiguration={'Status': 'Enabled'})
+        return {'versioning_enabled': True}
+
+    async def put_public_access_block():
+        await s3_call(s3.put_public_access_block, Bucket=bucket_name, PublicAccessBlockConfiguration=public_access_block)
+        return {'public_access_block': public_access_block}
+
+    async def put_policy():
+        await s3_call(s3.put_bucket_policy, Bucket=bucket_name, Policy=policy)
+        return {'policy_attached': True}
+
+    async def public_access_block_then_policy():
+        # Same ordering as the sync step graph: the policy follows the public access block
+        output = {}
+        if public_access_block:
+            try:
+                output.update(await _timed(report, 'public_access_block', put_public_access_block()))
+            except Exception:
+                if policy:
+                    report['policy'] = {'status': 'skipped', 'seconds': 0.0}
+                raise
+        if policy:
+            output.update(await _timed(report, 'policy', put_policy()))
+        return output
+
+    if state is not None:
+        result = {'bucket_created': False, 'message': 'Bucket already exists and is owned by you.', 'unchanged': unchanged}
+    else:
+        result = await _timed(report, 'create', create())
+    steps = []
+    if tags:
+        steps.append(_timed(report, 'tags', put_tags()))
+    if versioning:
+        steps.append(_timed(report, 'versioning', put_versioning()))
+    if public_access_block or policy:
+        steps.append(public_access_block_then_policy())
+    outputs = await asyncio.gather(*steps, return_exceptions=True)
+    for output in outputs:
+        if isinstance(output, Exception):
+            invalidate_bucket_state(bucket_name)
+            raise output
+    if reconcile:
+        store_bucket_state(bucket_name, apply_changes_to_state(state, versioning, tags, public_access_block, policy), changed=True)
+    else:
+        invalidate_bucket_state(bucket_name)
+    for output in outputs:
+        result.update(output)
+    result['steps'] = report
+    return result
+
+async def bucket_availability(bucket_name, region=None, profile=None):
+    if cached_bucket_state(bucket_name) is not None:
+        return {'bucket_name': bucket_name, 'available': False, 'owned': True}
+    s3 = await get_s3_client(region, profile)
+    try:
+        await s3_call(s3.head_bucket, Bucket=bucket_name)
+    except ClientError as e:
+        return _availability_from_error(bucket_name, e)
+    return {'bucket_name': bucket_name, 'available': False, 'owned': True}
+
+async def apply_policy(bucket_name, policy_json, region=None, profile=None):
+    state = cached_bucket_state(bucket_name)
+    validate_policy(policy_json, bucket_name, state and state['public_access_block'], 'apply_policy')
+    s3 = await get_s3_client(region, profile)
+    invalidate_bucket_state(bucket_name)
+    await s3_call(s3.put_bucket_policy, Bucket=bucket_name, Policy=policy_json)
+    return {'policy_applied': True}
\ No newline at end of file
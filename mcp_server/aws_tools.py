@@ -1,49 +1,419 @@
 import boto3
+import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import lru_cache
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
+from ratelimit import AdaptiveRateLimiter
+from metrics import span, POLICY_REJECTIONS
+from policy_validator import check_policy, PolicyValidationError
 load_dotenv()
 
-def get_s3_client():
-    return boto3.client(
+MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', '50'))
+
+# Every S3 call goes through a limiter, which also owns retries, so botocore's own
+# retry loop is disabled to keep throttling visible to it. This one serves the default
+# target (AWS_DEFAULT_REGION with the environment's credentials).
+rate_limiter = AdaptiveRateLimiter.from_env()
+
+# Other (region, profile) targets get their own limiter, so throttling in one
+# region or account never slows calls to another.
+_target_limiters = {}
+_limiters_lock = threading.Lock()
+
+def target_limiter(region=None, profile=None):
+    region = region or os.getenv('AWS_DEFAULT_REGION')
+    if profile is None and region == os.getenv('AWS_DEFAULT_REGION'):
+        return rate_limiter
+    limiter = _target_limiters.get((region, profile))
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _target_limiters.setdefault((region, profile), AdaptiveRateLimiter.from_env())
+    return limiter
+
+def limiter_stats():
+    stats = rate_limiter.stats()
+    stats['targets'] = {
+        f'{region}/{profile or "default"}': limiter.stats() for (region, profile), limiter in list(_target_limiters.items())
+    }
+    return stats
+
+# Limiter of each cached client, looked up from the bound method passed to s3_call
+_client_limiters = {}
+
+def s3_call(fn, **kwargs):
+    limiter = _client_limiters.get(getattr(fn, '__self__', None), rate_limiter)
+    with span(fn.__name__):
+        return limiter.call(fn, **kwargs)
+
+def location_constraint(region):
+    """CreateBucket arguments for a region; us-east-1 is the default and must not be named."""
+    if region and region != 'us-east-1':
+        return {'CreateBucketConfiguration': {'LocationConstraint': region}}
+    return {}
+
+# Process-wide client cache keyed by (region, profile, access key, secret key, endpoint).
+# boto3 clients are thread-safe once built, but building them is not, so
+# creation and teardown happen under a lock.
+_clients = {}
+_clients_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def known_regions():
+    """S3 regions of every partition botocore knows, plus any listed in S3_EXTRA_REGIONS."""
+    session = boto3.session.Session()
+    regions = {
+        region for partition in session.get_available_partitions()
+        for region in session.get_available_regions('s3', partition)
+    }
+    regions.update(region.strip() for region in os.getenv('S3_EXTRA_REGIONS', '').split(',') if region.strip())
+    return frozenset(regions)
+
+def validate_region(region):
+    """Raise ValueError for a region S3 does not have, before a client or limiter is cached for it."""
+    if region and region != os.getenv('AWS_DEFAULT_REGION') and region not in known_regions():
+        raise ValueError(f"Unknown AWS region '{region}'. Add it to S3_EXTRA_REGIONS if it is new.")
+
+def client_key(region=None, profile=None):
+    """Cache key for a target. A named profile supplies its own credentials."""
+    validate_region(region)
+    return (
+        region or os.getenv('AWS_DEFAULT_REGION'),
+        profile,
+        None if profile else os.getenv('AWS_ACCESS_KEY_ID'),
+        None if profile else os.getenv('AWS_SECRET_ACCESS_KEY'),
+        os.getenv('S3_ENDPOINT_URL'),
+    )
+
+def get_s3_client(region=None, profile=None):
+    key = client_key(region, profile)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            region, profile, access_key, secret_key, endpoint_url = key
+            with span('create_client'):
+                client = _build_s3_client(region, profile, access_key, secret_key, endpoint_url)
+            _client_limiters[client] = target_limiter(region, profile)
+            _clients[key] = client
+        return client
+
+def _build_s3_client(region, profile, access_key, secret_key, endpoint_url):
+    session = boto3.session.Session(
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region,
+        profile_name=profile
+    )
+    return session.client(
         's3',
-        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-        region_name=os.getenv('AWS_DEFAULT_REGION')
+        endpoint_url=endpoint_url,
+        config=Config(
+            max_pool_connections=MAX_POOL_CONNECTIONS,
+            tcp_keepalive=True,
+            retries={'total_max_attempts': 1}
+        )
     )
 
-def create_bucket_with_options(bucket_name, versioning, tags=None, public_access_block=None, policy=None):
-    s3 = get_s3_client()
-    result = {}
-    # Create bucket
+def close_s3_clients():
+    """Close and drop every cached client, e.g. after credential rotation."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _client_limiters.clear()
+    for client in clients:
+        client.close()
+
+def validate_policy(policy, bucket_name, public_access_block, operation):
+    """Raise PolicyValidationError for a policy S3 would refuse, before the request spends any S3 calls."""
+    try:
+        check_policy(policy, bucket_name, public_access_block)
+    except PolicyValidationError:
+        POLICY_REJECTIONS.inc(operation=operation)
+        raise
+
+STEP_CONCURRENCY = int(os.getenv('S3_STEP_CONCURRENCY', '32'))
+_step_executor = ThreadPoolExecutor(max_workers=STEP_CONCURRENCY, thread_name_prefix='bucket_steps')
+
+def _timed(fn):
+    start = time.perf_counter()
+    try:
+        return fn(), time.perf_counter() - start, None
+    except Exception as e:
+        return None, time.perf_counter() - start, e
+
+def run_step_graph(steps):
+    """Run (name, depends_on, fn) steps, starting each one as soon as its dependencies succeed.
+
+    Dependencies that are not part of the graph count as satisfied; steps whose
+    dependencies failed are skipped. Returns (outputs, report, errors) keyed by step name.
+    """
+    names = {name for name, _, _ in steps}
+    pending = list(steps)
+    running = {}
+    outputs, report, errors = {}, {}, {}
+    while pending or running:
+        progressed = False
+        for step in list(pending):
+            name, depends_on, fn = step
+            statuses = [report.get(dep, {}).get('status') for dep in depends_on if dep in names]
+            if any(status in ('error', 'skipped') for status in statuses):
+                report[name] = {'status': 'skipped', 'seconds': 0.0}
+            elif all(status == 'ok' for status in statuses):
+                running[_step_executor.submit(_timed, fn)] = name
+            else:
+                continue
+            pending.remove(step)
+            progressed = True
+        if not running:
+            if not progressed:
+                raise ValueError(f'Unresolvable step dependencies: {[name for name, _, _ in pending]}')
+            continue
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            output, seconds, error = future.result()
+            report[name] = {'status': 'error' if error else 'ok', 'seconds': round(seconds, 4)}
+            if error:
+                report[name]['error'] = str(error)
+                errors[name] = error
+            else:
+                outputs[name] = output
+    return outputs, report, errors
+
+PUBLIC_ACCESS_BLOCK_KEYS = ('BlockPublicAcls', 'IgnorePublicAcls', 'BlockPublicPolicy', 'RestrictPublicBuckets')
+STATE_CACHE_TTL = float(os.getenv('S3_STATE_CACHE_TTL', '30'))
+STATE_CACHE_MAX_ENTRIES = int(os.getenv('S3_STATE_CACHE_MAX_ENTRIES', '10000'))
+
+# Short-lived cache of observed bucket configuration, used by reconcile mode.
+# Entries are kept in store order, which is also expiry order since the TTL is fixed.
+_state_cache = OrderedDict()
+_state_lock = threading.Lock()
+
+def cached_bucket_state(bucket_name):
+    with _state_lock:
+        entry = _state_cache.get(bucket_name)
+        if entry is None:
+            return None
+        expires, state = entry
+        if expires < time.monotonic():
+            del _state_cache[bucket_name]
+            return None
+        return state
+
+# Called with the bucket name after every write, e.g. so the inventory index refetches it
+bucket_change_listeners = []
+
+def _notify_changed(bucket_name):
+    for listener in bucket_change_listeners:
+        listener(bucket_name)
+
+def store_bucket_state(bucket_name, state, changed=False):
+    now = time.monotonic()
+    with _state_lock:
+        _state_cache[bucket_name] = (now + STATE_CACHE_TTL, state)
+        _state_cache.move_to_end(bucket_name)
+        while _state_cache:
+            expires, _ = next(iter(_state_cache.values()))
+            if expires >= now and len(_state_cache) <= STATE_CACHE_MAX_ENTRIES:
+                break
+            _state_cache.popitem(last=False)
+    if changed:
+        _notify_changed(bucket_name)
+
+def invalidate_bucket_state(bucket_name):
+    with _state_lock:
+        _state_cache.pop(bucket_name, None)
+    _notify_changed(bucket_name)
+
+def _error_code(e):
+    return e.response.get('Error', {}).get('Code')
+
+def _read_tags(s3, bucket_name):
     try:
-        s3.create_bucket(Bucket=bucket_name)
-        result['bucket_created'] = True
+        tag_set = s3_call(s3.get_bucket_tagging, Bucket=bucket_name)['TagSet']
     except ClientError as e:
-        if e.response['Error']['Code'] == 'BucketAlreadyOwnedByYou':
-            result['bucket_created'] = False
-            result['message'] = 'Bucket already exists and is owned by you.'
-        else:
+        if _error_code(e) == 'NoSuchTagSet':
+            return {}
+        raise
+    return {tag['Key']: tag['Value'] for tag in tag_set}
+
+def _read_public_access_block(s3, bucket_name):
+    try:
+        return s3_call(s3.get_public_access_block, Bucket=bucket_name)['PublicAccessBlockConfiguration']
+    except ClientError as e:
+        if _error_code(e) == 'NoSuchPublicAccessBlockConfiguration':
+            return None
+        raise
+
+def _read_policy(s3, bucket_name):
+    try:
+        return s3_call(s3.get_bucket_policy, Bucket=bucket_name)['Policy']
+    except ClientError as e:
+        if _error_code(e) == 'NoSuchBucketPolicy':
+            return None
+        raise
+
+def get_bucket_state(bucket_name, use_cache=True, region=None, profile=None):
+    """Read a bucket's tags, versioning, public access block and policy in parallel.
+
+    Returns None if the bucket does not exist.
+    """
+    if use_cache:
+        state = cached_bucket_state(bucket_name)
+        if state is not None:
+            return state
+    s3 = get_s3_client(region, profile)
+    outputs, _, errors = run_step_graph([
+        ('tags', [], lambda: _read_tags(s3, bucket_name)),
+        ('versioning', [], lambda: s3_call(s3.get_bucket_versioning, Bucket=bucket_name).get('Status')),
+        ('public_access_block', [], lambda: _read_public_access_block(s3, bucket_name)),
+        ('policy', [], lambda: _read_policy(s3, bucket_name)),
+    ])
+    for error in errors.values():
+        if isinstance(error, ClientError) and _error_code(error) == 'NoSuchBucket':
+            invalidate_bucket_state(bucket_name)
+            return None
+    for error in errors.values():
+        raise error
+    store_bucket_state(bucket_name, outputs)
+    return outputs
+
+def _same_policy(current, desired):
+    try:
+        return json.loads(current) == json.loads(desired)
+    except (TypeError, ValueError):
+        return current == desired
+
+def plan_changes(state, versioning, tags=None, public_access_block=None, policy=None):
+    """Return the configuration steps whose desired value differs from the observed state."""
+    changes = set()
+    if tags and state['tags'] != tags:
+        changes.add('tags')
+    if versioning and state['versioning'] != 'Enabled':
+        changes.add('versioning')
+    if public_access_block:
+        current = state['public_access_block'] or {}
+        if any(current.get(k, False) != public_access_block.get(k, False) for k in PUBLIC_ACCESS_BLOCK_KEYS):
+            changes.add('public_access_block')
+    if policy and not _same_policy(state['policy'], policy):
+        changes.add('policy')
+    return changes
+
+def apply_changes_to_state(state, versioning, tags=None, public_access_block=None, policy=None):
+    state = dict(state or {'tags': {}, 'versioning': None, 'public_access_block': None, 'policy': None})
+    if tags:
+        state['tags'] = dict(tags)
+    if versioning:
+        state['versioning'] = 'Enabled'
+    if public_access_block:
+        state['public_access_block'] = {k: public_access_block.get(k, False) for k in PUBLIC_ACCESS_BLOCK_KEYS}
+    if policy:
+        state['policy'] = policy
+    return state
+
+def create_bucket_with_options(bucket_name, versioning, tags=None, public_access_block=None, policy=None, reconcile=False,
+                               region=None, profile=None):
+    if policy:
+        validate_policy(policy, bucket_name, public_access_block, 'create_bucket')
+    s3 = get_s3_client(region, profile)
+    # In reconcile mode only the settings that differ from the bucket's current state are written
+    state = get_bucket_state(bucket_name, region=region, profile=profile) if reconcile else None
+    changes = plan_changes(state, versioning, tags, public_access_block, policy) if state is not None else None
+
+    def create():
+        try:
+            s3_call(s3.create_bucket, Bucket=bucket_name, **location_constraint(s3.meta.region_name))
+            return {'bucket_created': True}
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'BucketAlreadyOwnedByYou':
+                return {'bucket_created': False, 'message': 'Bucket already exists and is owned by you.'}
             raise
-    # Add tags
+
+    def put_tags():
+        s3_call(s3.put_bucket_tagging, Bucket=bucket_name, Tagging={'TagSet': [{'Key': k, 'Value': v} for k, v in tags.items()]})
+        return {'tags_applied': True}
+
+    def put_versioning():
+        s3_call(s3.put_bucket_versioning, Bucket=bucket_name, VersioningConfiguration={'Status': 'Enabled'})
+        return {'versioning_enabled': True}
+
+    def put_public_access_block():
+        s3_call(s3.put_public_access_block, Bucket=bucket_name, PublicAccessBlockConfiguration=public_access_block)
+        return {'public_access_block': public_access_block}
+
+    def put_policy():
+        s3_call(s3.put_bucket_policy, Bucket=bucket_name, Policy=policy)
+        return {'policy_attached': True}
+
+    # Create first, then the independent settings in parallel. The policy waits
+    # for the public access block so a BlockPublicPolicy change is in effect first.
+    steps = [('create', [], create)]
     if tags:
-        s3.put_bucket_tagging(Bucket=bucket_name, Tagging={'TagSet': [{'Key': k, 'Value': v} for k, v in tags.items()]})
-        result['tags_applied'] = True
-    # Enable versioning
+        steps.append(('tags', ['create'], put_tags))
     if versioning:
-        s3.put_bucket_versioning(Bucket=bucket_name, VersioningConfiguration={'Status': 'Enabled'})
-        result['versioning_enabled'] = True
-    # Public access block
+        steps.append(('versioning', ['create'], put_versioning))
     if public_access_block:
-        s3.put_public_access_block(Bucket=bucket_name, PublicAccessBlockConfiguration=public_access_block)
-        result['public_access_block'] = public_access_block
-    # Attach policy
+        steps.append(('public_access_block', ['create'], put_public_access_block))
     if policy:
-        s3.put_bucket_policy(Bucket=bucket_name, Policy=policy)
-        result['policy_attached'] = True
+        steps.append(('policy', ['create', 'public_access_block'], put_policy))
+    if changes is not None:
+        unchanged = [name for name, _, _ in steps[1:] if name not in changes]
+        steps = [step for step in steps[1:] if step[0] in changes]
+
+    outputs, report, errors = run_step_graph(steps)
+    for name, _, _ in steps:
+        if name in errors:
+            invalidate_bucket_state(bucket_name)
+            raise errors[name]
+    if reconcile:
+        store_bucket_state(bucket_name, apply_changes_to_state(state, versioning, tags, public_access_block, policy), changed=True)
+    else:
+        invalidate_bucket_state(bucket_name)
+    result = {}
+    if changes is not None:
+        result['bucket_created'] = False
+        result['message'] = 'Bucket already exists and is owned by you.'
+        result['unchanged'] = unchanged
+    for name, _, _ in steps:
+        result.update(outputs.get(name, {}))
+    result['steps'] = report
     return result
 
-def apply_policy(bucket_name, policy_json):
-    s3 = get_s3_client()
-    s3.put_bucket_policy(Bucket=bucket_name, Policy=policy_json)
+def bucket_availability(bucket_name, region=None, profile=None):
+    """HeadBucket check: free to create, already owned by these credentials, or taken by someone else."""
+    if cached_bucket_state(bucket_name) is not None:
+        return {'bucket_name': bucket_name, 'available': False, 'owned': True}
+    s3 = get_s3_client(region, profile)
+    try:
+        s3_call(s3.head_bucket, Bucket=bucket_name)
+    except ClientError as e:
+        return _availability_from_error(bucket_name, e)
+    return {'bucket_name': bucket_name, 'available': False, 'owned': True}
+
+def _availability_from_error(bucket_name, error):
+    code = _error_code(error)
+    if code in ('404', 'NoSuchBucket'):
+        return {'bucket_name': bucket_name, 'available': True, 'owned': False}
+    if code in ('403', 'AccessDenied'):
+        return {'bucket_name': bucket_name, 'available': False, 'owned': False}
+    if code in ('301', 'PermanentRedirect'):
+        # Exists in another region; HeadBucket can't tell whose it is
+        return {'bucket_name': bucket_name, 'available': False, 'owned': None}
+    raise error
+
+def apply_policy(bucket_name, policy_json, region=None, profile=None):
+    # A cached public access block is checked too; an uncached one is left to S3
+    state = cached_bucket_state(bucket_name)
+    validate_policy(policy_json, bucket_name, state and state['public_access_block'], 'apply_policy')
+    s3 = get_s3_client(region, profile)
+    invalidate_bucket_state(bucket_name)
+    s3_call(s3.put_bucket_policy, Bucket=bucket_name, Policy=policy_json)
     return {'policy_applied': True}
\ No newline at end of file
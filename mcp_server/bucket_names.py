@@ -0,0 +1,22 @@
+import re
+
+# S3 bucket naming rules, shared by the assistant, the MCP server and bulk provisioning
+MIN_LENGTH = 3
+MAX_LENGTH = 63
+BUCKET_NAME_PATTERN = re.compile(r'^[a-z0-9][a-z0-9.-]*[a-z0-9]$')
+
+def has_bucket_name_shape(name):
+    """Length and characters only; cheap enough to try on every word of a message."""
+    return MIN_LENGTH <= len(name) <= MAX_LENGTH and BUCKET_NAME_PATTERN.match(name) is not None
+
+def validate_bucket_name(name):
+    """Return (is_valid, message) for a bucket name."""
+    if not name:
+        return False, 'Bucket name cannot be empty.'
+    if len(name) < MIN_LENGTH or len(name) > MAX_LENGTH:
+        return False, f'Bucket name must be between {MIN_LENGTH} and {MAX_LENGTH} characters.'
+    if not BUCKET_NAME_PATTERN.match(name):
+        return False, 'Bucket name can only contain lowercase letters, numbers, dots, and hyphens. It must start and end with a letter or number.'
+    if name.startswith('xn--') or name.endswith('-s3alias'):
+        return False, "Bucket name cannot start with 'xn--' or end with '-s3alias'."
+    return True, 'Valid bucket name.'
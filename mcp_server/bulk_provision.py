@@ -0,0 +1,224 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from aws_tools import create_bucket_with_options, validate_region
+from bucket_names import validate_bucket_name
+from policy_validator import policy_errors
+
+PUBLIC_ACCESS_BLOCK_ALL = {
+    'BlockPublicAcls': True,
+    'IgnorePublicAcls': True,
+    'BlockPublicPolicy': True,
+    'RestrictPublicBuckets': True,
+}
+
+class RateLimiter:
+    """Spaces out acquire() calls to at most `rate` per second across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+def _parse_csv_row(row):
+    # CSV columns: bucket_name, versioning, tags (k=v;k=v), public_access_block (true/false or JSON), policy
+    spec = {'bucket_name': (row.get('bucket_name') or '').strip()}
+    if row.get('versioning'):
+        spec['versioning'] = row['versioning'].strip().lower() in ('1', 'true', 'yes', 'enabled')
+    if row.get('tags'):
+        spec['tags'] = dict(pair.split('=', 1) for pair in row['tags'].split(';') if '=' in pair)
+    pab = (row.get('public_access_block') or '').strip()
+    if pab.startswith('{'):
+        spec['public_access_block'] = json.loads(pab)
+    elif pab.lower() in ('1', 'true', 'yes'):
+        spec['public_access_block'] = dict(PUBLIC_ACCESS_BLOCK_ALL)
+    if row.get('policy'):
+        spec['policy'] = row['policy']
+    return spec
+
+def read_manifest(path, skip=0):
+    """Yield (index, spec) for each record of a JSONL or CSV manifest, one line at a time.
+
+    Records before `skip` are not parsed. A record that cannot be parsed is
+    yielded as the exception instead of a spec.
+    """
+    with open(path, newline='') as f:
+        if path.lower().endswith('.csv'):
+            records = csv.DictReader(f)
+            parse = _parse_csv_row
+        else:
+            records = (line for line in f if line.strip())
+            parse = json.loads
+        for index, record in enumerate(records):
+            if index < skip:
+                continue
+            try:
+                yield index, parse(record)
+            except Exception as e:
+                yield index, e
+
+def validate_spec(spec):
+    """Return an error message for an invalid bucket spec, or None."""
+    if not isinstance(spec, dict):
+        return 'Record must be a JSON object.'
+    is_valid, message = validate_bucket_name(spec.get('bucket_name'))
+    if not is_valid:
+        return message
+    if not isinstance(spec.get('versioning', False), bool):
+        return 'versioning must be a boolean.'
+    tags = spec.get('tags')
+    if tags is not None and not (isinstance(tags, dict) and all(isinstance(v, str) for v in tags.values())):
+        return 'tags must be an object of string values.'
+    pab = spec.get('public_access_block')
+    if pab is not None and not (isinstance(pab, dict) and all(isinstance(v, bool) for v in pab.values())):
+        return 'public_access_block must be an object of boolean values.'
+    for field in ('region', 'profile'):
+        if spec.get(field) is not None and not isinstance(spec[field], str):
+            return f'{field} must be a string.'
+    try:
+        validate_region(spec.get('region'))
+    except ValueError as e:
+        return str(e)
+    if spec.get('policy') is not None:
+        if not isinstance(spec['policy'], str):
+            return 'policy must be a JSON string.'
+        errors = policy_errors(spec['policy'], spec['bucket_name'], pab)
+        if errors:
+            return ' '.join(errors)
+    return None
+
+def provision_one(spec, reconcile=False):
+    try:
+        result = create_bucket_with_options(
+            spec['bucket_name'],
+            spec.get('versioning', False),
+            tags=spec.get('tags'),
+            public_access_block=spec.get('public_access_block'),
+            policy=spec.get('policy'),
+            reconcile=reconcile,
+            region=spec.get('region'),
+            profile=spec.get('profile')
+        )
+        return {'status': 'success', 'result': result}
+    except Exception as e:
+        return {'status': 'error', 'detail': str(e)}
+
+def load_checkpoint(path):
+    """Return (watermark, indexes done above it, results size in bytes) or None."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    return checkpoint['completed'], set(checkpoint.get('done', ())), checkpoint.get('results_size')
+
+def save_checkpoint(path, completed, done=(), results_size=None):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'completed': completed, 'done': sorted(done), 'results_size': results_size}, f)
+    os.replace(tmp_path, path)
+
+def provision_manifest(manifest_path, results_path, checkpoint_path=None, concurrency=16, rate=None,
+                       reconcile=False, checkpoint_every=100):
+    """Stream a manifest through validation and bounded, rate-limited provisioning.
+
+    Results are appended to results_path as JSONL. The checkpoint records how many
+    leading records are finished, which later ones finished out of order, and how
+    long the results file was. An interrupted run cuts the results file back to that
+    length and provisions every other record again, so each record ends up with
+    exactly one result line; repeating a create is safe because
+    create_bucket_with_options is idempotent for buckets you own.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    start, done, results_size = checkpoint or (0, set(), None)
+    if results_size is not None and os.path.exists(results_path):
+        # Drop results written after the checkpoint; those records run again
+        os.truncate(results_path, results_size)
+    limiter = RateLimiter(rate) if rate else None
+    summary = {'success': 0, 'error': 0, 'invalid': 0, 'resumed_from': start}
+    completed = set(done)
+    watermark = start
+    since_checkpoint = 0
+
+    with open(results_path, 'a' if checkpoint else 'w') as results, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='bulk_provision') as executor:
+
+        def record(index, spec, outcome):
+            nonlocal watermark, since_checkpoint
+            bucket_name = spec.get('bucket_name') if isinstance(spec, dict) else None
+            results.write(json.dumps({'index': index, 'bucket_name': bucket_name, **outcome}) + '\n')
+            summary[outcome['status']] += 1
+            completed.add(index)
+            while watermark in completed:
+                completed.remove(watermark)
+                watermark += 1
+            since_checkpoint += 1
+            if checkpoint_path and since_checkpoint >= checkpoint_every:
+                results.flush()
+                save_checkpoint(checkpoint_path, watermark, completed, results.tell())
+                since_checkpoint = 0
+
+        def drain(return_when):
+            done, _ = wait(in_flight, return_when=return_when)
+            for future in done:
+                index, spec = in_flight.pop(future)
+                record(index, spec, future.result())
+
+        # At most two records per worker are buffered, whatever the manifest size
+        in_flight = {}
+        for index, spec in read_manifest(manifest_path, skip=start):
+            if index in done:
+                continue
+            if isinstance(spec, Exception):
+                record(index, None, {'status': 'invalid', 'detail': f'Could not parse record: {spec}'})
+                continue
+            error = validate_spec(spec)
+            if error:
+                record(index, spec, {'status': 'invalid', 'detail': error})
+                continue
+            while len(in_flight) >= concurrency * 2:
+                drain(FIRST_COMPLETED)
+            if limiter:
+                limiter.acquire()
+            in_flight[executor.submit(provision_one, spec, reconcile)] = (index, spec)
+        while in_flight:
+            drain(FIRST_COMPLETED)
+
+        results.flush()
+        if checkpoint_path:
+            save_checkpoint(checkpoint_path, watermark, completed, results.tell())
+    summary['completed'] = watermark
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Provision S3 buckets from a JSONL or CSV manifest.')
+    parser.add_argument('manifest')
+    parser.add_argument('--results', default='results.jsonl')
+    parser.add_argument('--checkpoint', help='checkpoint file; defaults to <manifest>.checkpoint')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rate', type=float, help='maximum buckets started per second')
+    parser.add_argument('--reconcile', action='store_true', help='only apply settings that differ')
+    args = parser.parse_args()
+    summary = provision_manifest(
+        args.manifest,
+        args.results,
+        checkpoint_path=args.checkpoint or args.manifest + '.checkpoint',
+        concurrency=args.concurrency,
+        rate=args.rate,
+        reconcile=args.reconcile
+    )
+    print(json.dumps(summary))
+
+if __name__ == '__main__':
+    main()
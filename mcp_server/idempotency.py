@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+class IdempotencyConflict(Exception):
+    pass
+
+def request_key(path, idempotency_key, payload):
+    """Return (key, fingerprint, store) for a request.
+
+    Requests with an Idempotency-Key are coalesced and their result stored;
+    requests without one are only coalesced with identical requests in flight.
+    """
+    fingerprint = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    if idempotency_key:
+        return (path, idempotency_key), fingerprint, True
+    return (path, fingerprint), fingerprint, False
+
+class IdempotencyStore:
+    """TTL/LRU store of completed results plus the operations currently in flight."""
+
+    def __init__(self, ttl=300.0, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _claim(self, key, fingerprint):
+        # Returns (future, owner); only the owner runs the operation
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None:
+                expires, stored_fingerprint, result = entry
+                if expires < time.monotonic():
+                    del self._results[key]
+                else:
+                    if stored_fingerprint != fingerprint:
+                        raise IdempotencyConflict('Idempotency-Key was already used with a different request.')
+                    self._results.move_to_end(key)
+                    future = Future()
+                    future.set_result(result)
+                    return future, False
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None:
+                in_flight_fingerprint, future = in_flight
+                if in_flight_fingerprint != fingerprint:
+                    raise IdempotencyConflict('Idempotency-Key is in use by a different request.')
+                return future, False
+            future = Future()
+            self._in_flight[key] = (fingerprint, future)
+            return future, True
+
+    def _finish(self, key, fingerprint, future, store, result=None, error=None):
+        with self._lock:
+            self._in_flight.pop(key, None)
+            # Failures are not stored so that a retry re-runs the operation
+            if store and error is None:
+                self._results[key] = (time.monotonic() + self.ttl, fingerprint, result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def run(self, key, fingerprint, fn, store=True):
+        future, owner = self._claim(key, fingerprint)
+        if not owner:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, fingerprint, future, store, error=e)
+            raise
+        self._finish(key, fingerprint, future, store, result=result)
+        return result
+
+    async def run_async(self, key, fingerprint, coro_fn, store=True):
+        future, owner = self._claim(key, fingerprint)
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            self._finish(key, fingerprint, future, store, error=e)
+            raise
+        self._finish(key, fingerprint, future, store, result=result)
+        return result
\ No newline at end of file
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from aws_tools import get_s3_client, get_bucket_state, s3_call, bucket_change_listeners
+
+INVENTORY_TTL = float(os.getenv('MCP_INVENTORY_TTL', '300'))
+INVENTORY_CONCURRENCY = int(os.getenv('MCP_INVENTORY_CONCURRENCY', '16'))
+# 0 lets S3 choose the ListBuckets page size
+INVENTORY_PAGE_SIZE = int(os.getenv('MCP_INVENTORY_PAGE_SIZE', '0'))
+
+_inventory_executor = ThreadPoolExecutor(max_workers=INVENTORY_CONCURRENCY, thread_name_prefix='inventory')
+
+def parse_tag_filters(values):
+    """Turn ['env=prod', 'team'] into {'env': 'prod', 'team': None}; None matches any value."""
+    filters = {}
+    for value in values or ():
+        key, _, wanted = value.partition('=')
+        filters[key] = wanted if _ else None
+    return filters
+
+def matches_tags(entry, filters):
+    tags = entry.get('tags') or {}
+    return all(key in tags and (wanted is None or tags[key] == wanted) for key, wanted in filters.items())
+
+def _list_buckets(s3):
+    kwargs = {'MaxBuckets': INVENTORY_PAGE_SIZE} if INVENTORY_PAGE_SIZE else {}
+    buckets = []
+    while True:
+        page = s3_call(s3.list_buckets, **kwargs)
+        buckets.extend(page.get('Buckets', []))
+        if not page.get('ContinuationToken'):
+            return buckets
+        kwargs['ContinuationToken'] = page['ContinuationToken']
+
+async def _list_buckets_async(s3):
+    import async_aws_tools
+
+    kwargs = {'MaxBuckets': INVENTORY_PAGE_SIZE} if INVENTORY_PAGE_SIZE else {}
+    buckets = []
+    while True:
+        page = await async_aws_tools.s3_call(s3.list_buckets, **kwargs)
+        buckets.extend(page.get('Buckets', []))
+        if not page.get('ContinuationToken'):
+            return buckets
+        kwargs['ContinuationToken'] = page['ContinuationToken']
+
+def _entry(bucket, state, error=None):
+    entry = {'bucket_name': bucket['Name'], 'creation_date': bucket['CreationDate'].isoformat()}
+    if error is not None:
+        entry['error'] = str(error)
+    else:
+        entry.update(state)
+    return entry
+
+class BucketIndex:
+    """In-memory inventory of every bucket's configuration.
+
+    A refresh lists buckets and only fetches configuration for buckets that are
+    new, were written through this server since the last refresh, failed last
+    time, or are older than the TTL. Everything else is served from the index.
+    """
+
+    def __init__(self, ttl=INVENTORY_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._changed = set()
+        self._lock = threading.Lock()
+        bucket_change_listeners.append(self.mark_changed)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def mark_changed(self, bucket_name):
+        with self._lock:
+            if bucket_name in self._entries:
+                self._changed.add(bucket_name)
+
+    def _plan(self, buckets, full):
+        """Split a listing into (fresh entries, buckets to fetch) and drop deleted buckets."""
+        cutoff = time.monotonic() - self.ttl
+        fresh, stale = [], []
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            listed = {bucket['Name'] for bucket in buckets}
+            for name in [name for name in self._entries if name not in listed]:
+                del self._entries[name]
+            for bucket in buckets:
+                cached = self._entries.get(bucket['Name'])
+                if full or cached is None or bucket['Name'] in changed or cached[0] < cutoff or 'error' in cached[1]:
+                    stale.append(bucket)
+                else:
+                    fresh.append(cached[1])
+        return fresh, stale
+
+    def _store(self, bucket, state, error):
+        if state is None and error is None:
+            # Deleted between ListBuckets and the config fetch
+            with self._lock:
+                self._entries.pop(bucket['Name'], None)
+            return None
+        entry = _entry(bucket, state, error)
+        with self._lock:
+            self._entries[bucket['Name']] = (time.monotonic(), entry)
+        return entry
+
+    def entries(self):
+        with self._lock:
+            return [entry for _, entry in self._entries.values()]
+
+    async def indexed_async(self):
+        for entry in self.entries():
+            yield entry
+
+    def refresh(self, full=False):
+        """List buckets now and return an iterator over every current entry.
+
+        Indexed entries come first; refetched ones follow as they complete.
+        """
+        fresh, stale = self._plan(_list_buckets(get_s3_client()), full)
+        futures = {
+            _inventory_executor.submit(get_bucket_state, bucket['Name'], use_cache=not full): bucket
+            for bucket in stale
+        }
+
+        def entries():
+            yield from fresh
+            for future in as_completed(futures):
+                error = future.exception()
+                entry = self._store(futures[future], None if error else future.result(), error)
+                if entry is not None:
+                    yield entry
+
+        return entries()
+
+    async def refresh_async(self, full=False):
+        import async_aws_tools
+
+        fresh, stale = self._plan(await _list_buckets_async(await async_aws_tools.get_s3_client()), full)
+        semaphore = asyncio.Semaphore(INVENTORY_CONCURRENCY)
+
+        async def fetch(bucket):
+            async with semaphore:
+                try:
+                    state = await async_aws_tools.get_bucket_state(bucket['Name'], use_cache=not full)
+                except Exception as e:
+                    return self._store(bucket, None, e)
+                return self._store(bucket, state, None)
+
+        tasks = [asyncio.ensure_future(fetch(bucket)) for bucket in stale]
+
+        async def entries():
+            try:
+                for entry in fresh:
+                    yield entry
+                for task in asyncio.as_completed(tasks):
+                    entry = await task
+                    if entry is not None:
+                        yield entry
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return entries()
+
+bucket_index = BucketIndex()
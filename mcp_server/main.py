@@ -1,39 +1,367 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from fastapi import FastAPI, HTTPException, Header, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from aws_tools import create_bucket_with_options, apply_policy
+from typing import Optional, Dict, Any, List
+from aws_tools import (
+    create_bucket_with_options, apply_policy, bucket_availability, close_s3_clients, rate_limiter, limiter_stats,
+    validate_region
+)
+from bucket_names import validate_bucket_name
+from idempotency import IdempotencyStore, IdempotencyConflict, request_key
+from inventory import bucket_index, matches_tags, parse_tag_filters
+import metrics
 
 app = FastAPI()
 
+# Serve the endpoints from the aiobotocore backend instead of blocking boto3 calls
+ASYNC_BACKEND = os.getenv("MCP_ASYNC_BACKEND", "").lower() in ("1", "true", "yes")
+
+# Bounded worker pool shared by all batch requests
+BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_CONCURRENCY", "16"))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix="create_buckets")
+# Most batch buckets in flight per (region, profile) target across all requests. Set it below
+# MCP_BATCH_CONCURRENCY so a throttled target can't hold every worker
+TARGET_CONCURRENCY = int(os.getenv("MCP_TARGET_CONCURRENCY", str(BATCH_CONCURRENCY)))
+
+# Results of requests sent with an Idempotency-Key, and coalescing of identical in-flight requests
+idempotency_store = IdempotencyStore(
+    ttl=float(os.getenv("MCP_IDEMPOTENCY_TTL", "300")),
+    max_entries=int(os.getenv("MCP_IDEMPOTENCY_MAX_ENTRIES", "10000"))
+)
+
 class BucketRequest(BaseModel):
     bucket_name: str
     versioning: bool = False
     tags: Optional[Dict[str, str]] = None
     public_access_block: Optional[Dict[str, bool]] = None
     policy: Optional[str] = None
+    reconcile: bool = False
+    # Target region and named AWS profile; defaults are AWS_DEFAULT_REGION and the environment's credentials
+    region: Optional[str] = None
+    profile: Optional[str] = None
 
 class PolicyRequest(BaseModel):
     bucket_name: str
     policy_json: str
+    region: Optional[str] = None
+    profile: Optional[str] = None
+
+def request_target(req: BucketRequest):
+    return (req.region or os.getenv("AWS_DEFAULT_REGION"), req.profile)
+
+if metrics.ENABLED:
+    class RequestMetricsMiddleware:
+        """Plain ASGI middleware, so a request counts until its last body chunk is sent.
+
+        An @app.middleware("http") hook returns once the headers go out, which would
+        time the streamed endpoints (/create_buckets, /buckets) to their first byte.
+        """
+
+        def __init__(self, app):
+            self.app = app
+
+        async def __call__(self, scope, receive, send):
+            if scope["type"] != "http":
+                return await self.app(scope, receive, send)
+            # Label by route template rather than raw path to keep cardinality bounded
+            endpoint = scope["path"] if scope["path"] in ROUTE_PATHS else "unmatched"
+            metrics.HTTP_IN_FLIGHT.inc(endpoint=endpoint)
+            start = time.perf_counter()
+            status = 500
+            finished = False
+
+            def finish():
+                nonlocal finished
+                if not finished:
+                    finished = True
+                    metrics.HTTP_IN_FLIGHT.dec(endpoint=endpoint)
+                    metrics.HTTP_REQUEST_SECONDS.observe(
+                        time.perf_counter() - start, method=scope["method"], endpoint=endpoint, status=status
+                    )
+
+            async def send_and_observe(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                await send(message)
+                if message["type"] == "http.response.body" and not message.get("more_body", False):
+                    finish()
+
+            try:
+                await self.app(scope, receive, send_and_observe)
+            finally:
+                # Errors and disconnects before the last chunk still count
+                finish()
+
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get("/metrics")
+    def metrics_endpoint():
+        for name, value in rate_limiter.stats().items():
+            RATE_LIMITER_GAUGE.set(value, stat=name)
+        return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
-@app.post("/create_bucket")
-def create_bucket(req: BucketRequest):
+    RATE_LIMITER_GAUGE = metrics.Gauge(
+        "mcp_s3_rate_limiter", "Adaptive S3 rate limiter state (rate and cumulative counts).", ("stat",)
+    )
+
+@app.get("/rate_limiter")
+def rate_limiter_stats():
+    return limiter_stats()
+
+def check_bucket_name(bucket_name: str):
+    is_valid, message = validate_bucket_name(bucket_name)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=message)
+
+def create_from_request(req: BucketRequest):
+    return create_bucket_with_options(
+        req.bucket_name,
+        req.versioning,
+        tags=req.tags,
+        public_access_block=req.public_access_block,
+        policy=req.policy,
+        reconcile=req.reconcile,
+        region=req.region,
+        profile=req.profile
+    )
+
+def invalid_target_item(req: BucketRequest):
+    # Checked before a per-target slot is made, so unknown regions never add one
+    try:
+        validate_region(req.region)
+    except ValueError as e:
+        return {"bucket_name": req.bucket_name, "status": "error", "detail": str(e)}
+    return None
+
+def create_batch_item(req: BucketRequest):
+    # A failed bucket is reported in its own result line and never aborts the batch
     try:
-        result = create_bucket_with_options(
+        return {"bucket_name": req.bucket_name, "status": "success", "result": create_from_request(req)}
+    except Exception as e:
+        return {"bucket_name": req.bucket_name, "status": "error", "detail": str(e)}
+
+if ASYNC_BACKEND:
+    import async_aws_tools
+
+    batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    target_semaphores = {}
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        batch_executor.shutdown(wait=False)
+        await async_aws_tools.close_s3_clients()
+
+    async def async_create_from_request(req: BucketRequest):
+        return await async_aws_tools.create_bucket_with_options(
             req.bucket_name,
             req.versioning,
             tags=req.tags,
             public_access_block=req.public_access_block,
-            policy=req.policy
+            policy=req.policy,
+            reconcile=req.reconcile,
+            region=req.region,
+            profile=req.profile
         )
-        return {"status": "success", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/apply_policy")
-def apply_policy_endpoint(req: PolicyRequest):
-    try:
-        result = apply_policy(req.bucket_name, req.policy_json)
-        return {"status": "success", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+    async def async_create_batch_item(req: BucketRequest):
+        invalid = invalid_target_item(req)
+        if invalid:
+            return invalid
+        target = request_target(req)
+        if target not in target_semaphores:
+            target_semaphores[target] = asyncio.Semaphore(TARGET_CONCURRENCY)
+        # The target slot is taken first, so requests waiting on a busy target hold no batch slot
+        async with target_semaphores[target], batch_semaphore:
+            try:
+                return {"bucket_name": req.bucket_name, "status": "success", "result": await async_create_from_request(req)}
+            except Exception as e:
+                return {"bucket_name": req.bucket_name, "status": "error", "detail": str(e)}
+
+    @app.post("/create_bucket")
+    async def create_bucket(req: BucketRequest, idempotency_key: Optional[str] = Header(None)):
+        key, fingerprint, store = request_key("/create_bucket", idempotency_key, jsonable_encoder(req))
+        try:
+            result = await idempotency_store.run_async(key, fingerprint, lambda: async_create_from_request(req), store=store)
+            return {"status": "success", "result": result}
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.post("/create_buckets")
+    async def create_buckets(reqs: List[BucketRequest]):
+        tasks = [asyncio.ensure_future(async_create_batch_item(req)) for req in reqs]
+
+        async def stream_results():
+            try:
+                for task in asyncio.as_completed(tasks):
+                    yield json.dumps(await task) + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+    @app.post("/apply_policy")
+    async def apply_policy_endpoint(req: PolicyRequest, idempotency_key: Optional[str] = Header(None)):
+        key, fingerprint, store = request_key("/apply_policy", idempotency_key, jsonable_encoder(req))
+        try:
+            result = await idempotency_store.run_async(
+                key, fingerprint, lambda: async_aws_tools.apply_policy(req.bucket_name, req.policy_json, req.region, req.profile),
+                store=store
+            )
+            return {"status": "success", "result": result}
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.get("/bucket_availability")
+    async def bucket_availability_endpoint(bucket_name: str, region: Optional[str] = None, profile: Optional[str] = None):
+        check_bucket_name(bucket_name)
+        try:
+            result = await async_aws_tools.bucket_availability(bucket_name, region, profile)
+            return {"status": "success", "result": result}
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.get("/buckets")
+    async def list_buckets(tag: Optional[List[str]] = Query(None), refresh: bool = True, full: bool = False):
+        filters = parse_tag_filters(tag)
+        try:
+            if refresh or not len(bucket_index):
+                entries = await bucket_index.refresh_async(full=full)
+            else:
+                entries = bucket_index.indexed_async()
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        async def stream_results():
+            async for entry in entries:
+                if matches_tags(entry, filters):
+                    yield json.dumps(entry) + "\n"
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+else:
+    # Process-wide like the async semaphores, so concurrent batches share each target's limit
+    target_slots = {}
+    target_slots_lock = threading.Lock()
+    # How often a batch waiting only on other requests' target slots checks for a free one
+    SLOT_POLL_SECONDS = 0.05
+
+    def target_slot(target):
+        with target_slots_lock:
+            if target not in target_slots:
+                target_slots[target] = threading.BoundedSemaphore(TARGET_CONCURRENCY)
+            return target_slots[target]
+
+    @app.on_event("shutdown")
+    def shutdown():
+        batch_executor.shutdown(wait=False)
+        close_s3_clients()
+
+    @app.post("/create_bucket")
+    def create_bucket(req: BucketRequest, idempotency_key: Optional[str] = Header(None)):
+        key, fingerprint, store = request_key("/create_bucket", idempotency_key, jsonable_encoder(req))
+        try:
+            result = idempotency_store.run(key, fingerprint, lambda: create_from_request(req), store=store)
+            return {"status": "success", "result": result}
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.post("/create_buckets")
+    def create_buckets(reqs: List[BucketRequest]):
+        # Per-target queues; a bucket is only handed to a worker once its target has a free slot,
+        # so requests waiting on a busy target never hold a batch worker
+        queues = {}
+        rejected = []
+        for req in reqs:
+            invalid = invalid_target_item(req)
+            if invalid:
+                rejected.append(invalid)
+            else:
+                queues.setdefault(request_target(req), deque()).append(req)
+        running = set()
+
+        def submit_ready():
+            for target, queue in queues.items():
+                slot = target_slot(target)
+                while queue and slot.acquire(blocking=False):
+                    future = batch_executor.submit(create_batch_item, queue.popleft())
+                    future.add_done_callback(lambda _, slot=slot: slot.release())
+                    running.add(future)
+
+        def stream_results():
+            # One NDJSON line per bucket, in completion order
+            submit_ready()
+            for item in rejected:
+                yield json.dumps(item) + "\n"
+            while running or any(queues.values()):
+                if running:
+                    # Wake up now and then to pick up slots freed by other requests
+                    timeout = SLOT_POLL_SECONDS if any(queues.values()) else None
+                    done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    # Every queued target is full of other requests' buckets
+                    done = ()
+                    time.sleep(SLOT_POLL_SECONDS)
+                for future in done:
+                    running.discard(future)
+                    yield json.dumps(future.result()) + "\n"
+                submit_ready()
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+    @app.post("/apply_policy")
+    def apply_policy_endpoint(req: PolicyRequest, idempotency_key: Optional[str] = Header(None)):
+        key, fingerprint, store = request_key("/apply_policy", idempotency_key, jsonable_encoder(req))
+        try:
+            result = idempotency_store.run(
+                key, fingerprint, lambda: apply_policy(req.bucket_name, req.policy_json, req.region, req.profile), store=store
+            )
+            return {"status": "success", "result": result}
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.get("/bucket_availability")
+    def bucket_availability_endpoint(bucket_name: str, region: Optional[str] = None, profile: Optional[str] = None):
+        # HeadBucket only; the name is a query parameter so metrics keep one label for the route
+        check_bucket_name(bucket_name)
+        try:
+            return {"status": "success", "result": bucket_availability(bucket_name, region, profile)}
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    @app.get("/buckets")
+    def list_buckets(tag: Optional[List[str]] = Query(None), refresh: bool = True, full: bool = False):
+        # tag=key=value or tag=key, repeatable; refresh=false serves the index without listing
+        filters = parse_tag_filters(tag)
+        try:
+            if refresh or not len(bucket_index):
+                entries = bucket_index.refresh(full=full)
+            else:
+                entries = bucket_index.entries()
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        def stream_results():
+            for entry in entries:
+                if matches_tags(entry, filters):
+                    yield json.dumps(entry) + "\n"
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+ROUTE_PATHS = frozenset(route.path for route in app.routes)
\ No newline at end of file
@@ -0,0 +1,217 @@
+import fnmatch
+import json
+import re
+
+# Bucket policies are capped at 20 KB by S3
+MAX_POLICY_BYTES = 20 * 1024
+
+# Condition keys that pin a wildcard principal to fixed sources, so S3 does not treat the statement as public
+RESTRICTING_CONDITION_KEYS = frozenset(key.lower() for key in (
+    'aws:SourceArn', 'aws:SourceVpc', 'aws:SourceVpce', 'aws:SourceAccount', 'aws:SourceOwner',
+    'aws:SourceIp', 'aws:PrincipalAccount', 'aws:PrincipalOrgID', 'aws:PrincipalArn', 'aws:userid',
+))
+
+_CONDITION_OPERATORS = (
+    'StringEquals|StringNotEquals|StringEqualsIgnoreCase|StringNotEqualsIgnoreCase|StringLike|StringNotLike'
+    '|NumericEquals|NumericNotEquals|NumericLessThan|NumericLessThanEquals|NumericGreaterThan|NumericGreaterThanEquals'
+    '|DateEquals|DateNotEquals|DateLessThan|DateLessThanEquals|DateGreaterThan|DateGreaterThanEquals'
+    '|Bool|BinaryEquals|IpAddress|NotIpAddress|ArnEquals|ArnLike|ArnNotEquals|ArnNotLike'
+)
+
+_ACTIONS = {'type': 'one_or_many', 'items': {
+    'type': 'string', 'pattern': r'\*|(?i:s3):[A-Za-z*?]+', 'message': 'must be an S3 action such as s3:GetObject.',
+}}
+_RESOURCES = {'type': 'one_or_many', 'items': {
+    'type': 'string', 'pattern': r'arn:aws[\w-]*:s3:::[^/]+(?:/.*)?',
+    'message': 'must be an S3 bucket or object ARN.',
+}}
+_PRINCIPAL = {'type': 'any_of', 'message': 'must be "*" or an object of AWS, Service, Federated or CanonicalUser principals.', 'options': [
+    {'type': 'string', 'enum': ['*']},
+    {'type': 'object', 'min_properties': 1, 'properties': {
+        'AWS': {'type': 'one_or_many', 'items': {
+            'type': 'string',
+            # Only the ARN shape is checked; S3 itself decides which IAM and STS principals exist
+            'pattern': r'\*|\d{12}|arn:aws[\w-]*:(?:iam|sts)::[^:\s]+:.+',
+            'message': 'must be "*", an account ID or an IAM or STS principal ARN.',
+        }},
+        'Service': {'type': 'one_or_many', 'items': {
+            'type': 'string', 'pattern': r'[a-z0-9.-]+\.amazonaws\.com(?:\.cn)?', 'message': 'must be a service principal.',
+        }},
+        'Federated': {'type': 'one_or_many', 'items': {'type': 'string'}},
+        'CanonicalUser': {'type': 'one_or_many', 'items': {
+            'type': 'string', 'pattern': r'[0-9a-f]{64}', 'message': 'must be a 64 character canonical user ID.',
+        }},
+    }},
+]}
+_CONDITION = {'type': 'object', 'key_pattern': rf'(?:ForAllValues:|ForAnyValue:)?(?:(?:{_CONDITION_OPERATORS})(?:IfExists)?|Null)', 'values': {
+    'type': 'object', 'min_properties': 1, 'key_pattern': r'[A-Za-z0-9-]+:[^\s]+', 'values': {'type': 'one_or_many', 'items': {'type': 'scalar'}},
+}}
+_STATEMENT = {'type': 'object', 'properties': {
+    'Sid': {'type': 'string'},
+    'Effect': {'type': 'string', 'enum': ['Allow', 'Deny']},
+    'Principal': _PRINCIPAL,
+    'NotPrincipal': _PRINCIPAL,
+    'Action': _ACTIONS,
+    'NotAction': _ACTIONS,
+    'Resource': _RESOURCES,
+    'NotResource': _RESOURCES,
+    'Condition': _CONDITION,
+}, 'required': ['Effect'], 'exactly_one': [('Principal', 'NotPrincipal'), ('Action', 'NotAction'), ('Resource', 'NotResource')]}
+POLICY_SCHEMA = {'type': 'object', 'properties': {
+    'Version': {'type': 'string', 'enum': ['2012-10-17', '2008-10-17']},
+    'Id': {'type': 'string'},
+    'Statement': {'type': 'one_or_many', 'items': _STATEMENT},
+}, 'required': ['Statement']}
+
+_PYTHON_TYPES = {'string': str, 'object': dict, 'one_or_many': (str, list), 'scalar': (str, bool, int, float)}
+
+def compile_schema(node):
+    """Turn a schema node into a check(value, path, errors) function.
+
+    Patterns and lookups are prepared here once, so checking a policy is only
+    a walk over its elements.
+    """
+    kind = node['type']
+    if kind == 'string':
+        enum = frozenset(node.get('enum', ()))
+        match = re.compile(node['pattern']).fullmatch if 'pattern' in node else None
+        message = node.get('message', 'is not valid.')
+        def check(value, path, errors):
+            if not isinstance(value, str):
+                errors.append(f'{path} must be a string.')
+            elif enum and value not in enum:
+                errors.append(f'{path} must be one of {", ".join(sorted(enum))}.')
+            elif match and not match(value):
+                errors.append(f'{path} {message}')
+    elif kind == 'scalar':
+        def check(value, path, errors):
+            if not isinstance(value, (str, bool, int, float)):
+                errors.append(f'{path} must be a string, number or boolean.')
+    elif kind == 'one_or_many':
+        item = compile_schema(node['items'])
+        def check(value, path, errors):
+            if not isinstance(value, list):
+                item(value, path, errors)
+            elif not value:
+                errors.append(f'{path} cannot be empty.')
+            else:
+                for index, element in enumerate(value):
+                    item(element, f'{path}[{index}]', errors)
+    elif kind == 'any_of':
+        options = [(_PYTHON_TYPES[option['type']], compile_schema(option)) for option in node['options']]
+        message = node['message']
+        def check(value, path, errors):
+            shaped = None
+            for python_type, option in options:
+                option_errors = []
+                option(value, path, option_errors)
+                if not option_errors:
+                    return
+                if shaped is None and isinstance(value, python_type):
+                    shaped = option_errors
+            # A value of the right shape gets that option's specific errors
+            errors.extend(shaped or [f'{path} {message}'])
+    elif kind == 'object':
+        properties = {name: compile_schema(child) for name, child in node.get('properties', {}).items()}
+        values = compile_schema(node['values']) if 'values' in node else None
+        key_match = re.compile(node['key_pattern']).fullmatch if 'key_pattern' in node else None
+        required = tuple(node.get('required', ()))
+        exactly_one = tuple(node.get('exactly_one', ()))
+        min_properties = node.get('min_properties', 0)
+        def check(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append(f'{path} must be an object.')
+                return
+            if len(value) < min_properties:
+                errors.append(f'{path} cannot be empty.')
+            for name in required:
+                if name not in value:
+                    errors.append(f'{path} is missing {name}.')
+            for group in exactly_one:
+                present = [name for name in group if name in value]
+                if len(present) != 1:
+                    errors.append(f'{path} must have exactly one of {" or ".join(group)}.')
+            for name, element in value.items():
+                child = properties.get(name)
+                if child is not None:
+                    child(element, f'{path}.{name}', errors)
+                elif key_match is not None and key_match(name):
+                    values(element, f'{path}.{name}', errors)
+                else:
+                    errors.append(f'{path}.{name} is not a valid policy element.')
+    else:
+        raise ValueError(f'Unknown schema node type: {kind}')
+    return check
+
+_check_policy_grammar = compile_schema(POLICY_SCHEMA)
+
+class PolicyValidationError(ValueError):
+    """A bucket policy that S3 would reject, found without calling S3."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('Invalid bucket policy: ' + ' '.join(self.errors))
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+def _statements(document):
+    return [s for s in _as_list(document.get('Statement', [])) if isinstance(s, dict)]
+
+def _check_resources(document, bucket_name, errors):
+    for index, statement in enumerate(_statements(document)):
+        for name in ('Resource', 'NotResource'):
+            for resource in _as_list(statement.get(name, [])):
+                if not isinstance(resource, str) or ':s3:::' not in resource:
+                    continue
+                bucket = resource.split(':s3:::', 1)[1].split('/', 1)[0]
+                if not fnmatch.fnmatchcase(bucket_name, bucket):
+                    errors.append(f'Statement[{index}].{name} {resource} does not refer to bucket {bucket_name}.')
+
+def is_public_statement(statement):
+    """True if S3 would count this statement as granting public access."""
+    if statement.get('Effect') != 'Allow' or 'Principal' not in statement:
+        return False
+    principal = statement['Principal']
+    if principal != '*' and not (isinstance(principal, dict) and '*' in _as_list(principal.get('AWS', []))):
+        return False
+    condition = statement.get('Condition')
+    if isinstance(condition, dict):
+        for keys in condition.values():
+            if isinstance(keys, dict) and any(key.lower() in RESTRICTING_CONDITION_KEYS for key in keys):
+                return False
+    return True
+
+def policy_errors(policy, bucket_name=None, public_access_block=None):
+    """Return the reasons S3 would reject a bucket policy, or an empty list.
+
+    policy may be a JSON string or an already parsed document. Resources are
+    only matched when bucket_name is given, and the public access conflict
+    only when public_access_block is.
+    """
+    if isinstance(policy, str):
+        if len(policy.encode()) > MAX_POLICY_BYTES:
+            return [f'Policy is larger than {MAX_POLICY_BYTES // 1024} KB.']
+        try:
+            document = json.loads(policy)
+        except ValueError as e:
+            return [f'Policy is not valid JSON: {e}.']
+    else:
+        document = policy
+    errors = []
+    _check_policy_grammar(document, 'Policy', errors)
+    if errors:
+        return errors
+    if bucket_name:
+        _check_resources(document, bucket_name, errors)
+    if public_access_block and public_access_block.get('BlockPublicPolicy'):
+        for index, statement in enumerate(_statements(document)):
+            if is_public_statement(statement):
+                errors.append(f'Statement[{index}] grants public access, which BlockPublicPolicy in the public access block rejects.')
+    return errors
+
+def check_policy(policy, bucket_name=None, public_access_block=None):
+    """Raise PolicyValidationError if S3 would reject the policy."""
+    errors = policy_errors(policy, bucket_name, public_access_block)
+    if errors:
+        raise PolicyValidationError(errors)
@@ -0,0 +1,151 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+# S3 error codes that mean "slow down"; the limiter cuts its rate when it sees them
+THROTTLE_CODES = frozenset({
+    'SlowDown', 'TooManyRequests', 'Throttling', 'ThrottlingException',
+    'RequestLimitExceeded', 'OperationAborted', 'RequestThrottled',
+})
+# Transient failures that are retried without touching the rate
+TRANSIENT_CODES = frozenset({'InternalError', 'ServiceUnavailable', 'RequestTimeout'})
+
+def classify_error(error):
+    """Return 'throttle', 'transient' or None for an exception raised by an S3 call."""
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        status = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+        if code in THROTTLE_CODES or status in (429, 503):
+            return 'throttle'
+        if code in TRANSIENT_CODES or (status is not None and status >= 500):
+            return 'transient'
+        return None
+    if isinstance(error, (ConnectionError, HTTPClientError)):
+        return 'transient'
+    return None
+
+class AdaptiveRateLimiter:
+    """Token bucket shared by all S3 calls, with AIMD rate control and jittered retries.
+
+    The rate starts at max_rate unless given, so the limiter only holds calls back
+    once S3 has pushed back. A throttling response multiplies the rate by `decrease`
+    (at most once per cooldown); after that every success raises it by roughly
+    `increase` requests/second per second. Throttled and transient failures are
+    retried with full-jitter exponential backoff.
+    """
+
+    def __init__(self, rate=None, min_rate=1.0, max_rate=500.0, burst=None, increase=1.0, decrease=0.5,
+                 cooldown=0.5, max_attempts=8, backoff_base=0.1, backoff_cap=10.0):
+        rate = max_rate if rate is None else min(rate, max_rate)
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst or max(rate, 1.0)
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttles = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            rate=float(os.environ['S3_RATE_LIMIT']) if os.getenv('S3_RATE_LIMIT') else None,
+            min_rate=float(os.getenv('S3_MIN_RATE', '1')),
+            max_rate=float(os.getenv('S3_MAX_RATE', '500')),
+            max_attempts=int(os.getenv('S3_MAX_ATTEMPTS', '8')),
+            backoff_base=float(os.getenv('S3_BACKOFF_BASE', '0.1')),
+            backoff_cap=float(os.getenv('S3_BACKOFF_CAP', '10')),
+        )
+
+    def reserve(self):
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            self.calls += 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_error(self, kind):
+        with self._lock:
+            self.retries += 1
+            if kind != 'throttle':
+                return
+            self.throttles += 1
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+
+    def on_give_up(self):
+        with self._lock:
+            self.failures += 1
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def call(self, fn, *args, **kwargs):
+        for attempt in range(self.max_attempts):
+            delay = self.reserve()
+            if delay:
+                time.sleep(delay)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind is None or attempt == self.max_attempts - 1:
+                    if kind is not None:
+                        self.on_give_up()
+                    raise
+                self.on_error(kind)
+                time.sleep(self.backoff(attempt))
+                continue
+            self.on_success()
+            return result
+
+    async def call_async(self, fn, *args, **kwargs):
+        for attempt in range(self.max_attempts):
+            delay = self.reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind is None or attempt == self.max_attempts - 1:
+                    if kind is not None:
+                        self.on_give_up()
+                    raise
+                self.on_error(kind)
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            self.on_success()
+            return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rate': round(self.rate, 3),
+                'calls': self.calls,
+                'retries': self.retries,
+                'throttles': self.throttles,
+                'failures': self.failures,
+            }
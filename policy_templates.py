@@ -0,0 +1,202 @@
+import json
+import re
+
+
+ACCOUNT_ID_PATTERN = re.compile(r"(?<![\d:])\d{12}(?![\d:])")
+IAM_PRINCIPAL_PATTERN = re.compile(
+    r"arn:aws:iam::\d{12}:(?:root|user/[\w+=,.@/-]+|role/[\w+=,.@/-]+)"
+)
+DISTRIBUTION_ARN_PATTERN = re.compile(
+    r"arn:aws:cloudfront::\d{12}:distribution/[A-Z0-9]+"
+)
+# Kinds of access a requirement can ask for; a template is only used when it
+# grants every kind mentioned
+ACCESS_PATTERNS = {
+    "read": re.compile(r"\b(?:read|get|download|view|list|fetch)"),
+    "write": re.compile(r"\b(?:write|upload|put|modify|overwrite)"),
+    "delete": re.compile(r"\b(?:delete|remove)"),
+    "full": re.compile(r"\b(?:full (?:access|control|permissions?)|all (?:actions|permissions)|admin)|s3:\*"),
+}
+
+
+def requested_access(text):
+    """Kinds of access ("read", "write", "delete", "full") the text mentions"""
+    text_lower = text.lower()
+    return {kind for kind, pattern in ACCESS_PATTERNS.items() if pattern.search(text_lower)}
+
+
+def bucket_arns(bucket_name):
+    """ARNs for the bucket itself and for every object in it"""
+    return f"arn:aws:s3:::{bucket_name}", f"arn:aws:s3:::{bucket_name}/*"
+
+
+def extract_principals(text):
+    """IAM principal ARNs mentioned in the text; bare account IDs become account roots"""
+    principals = IAM_PRINCIPAL_PATTERN.findall(text)
+    for account_id in ACCOUNT_ID_PATTERN.findall(text):
+        root = f"arn:aws:iam::{account_id}:root"
+        if root not in principals:
+            principals.append(root)
+    return principals
+
+
+def _policy(*statements):
+    return {"Version": "2012-10-17", "Statement": list(statements)}
+
+
+def deny_insecure_transport(bucket_name, text):
+    bucket_arn, objects_arn = bucket_arns(bucket_name)
+    return _policy(
+        {
+            "Sid": "DenyInsecureTransport",
+            "Effect": "Deny",
+            "Principal": "*",
+            "Action": "s3:*",
+            "Resource": [bucket_arn, objects_arn],
+            "Condition": {"Bool": {"aws:SecureTransport": "false"}},
+        }
+    )
+
+
+def cloudfront_oac(bucket_name, text):
+    distributions = DISTRIBUTION_ARN_PATTERN.findall(text)
+    if not distributions:
+        return None
+    _, objects_arn = bucket_arns(bucket_name)
+    return _policy(
+        {
+            "Sid": "AllowCloudFrontServicePrincipalReadOnly",
+            "Effect": "Allow",
+            "Principal": {"Service": "cloudfront.amazonaws.com"},
+            "Action": "s3:GetObject",
+            "Resource": objects_arn,
+            "Condition": {
+                "StringEquals": {
+                    "AWS:SourceArn": (
+                        distributions[0] if len(distributions) == 1 else distributions
+                    )
+                }
+            },
+        }
+    )
+
+
+def cross_account_read(bucket_name, text):
+    principals = extract_principals(text)
+    # "Cross-account" alone does not say which access to grant
+    if not principals or "read" not in requested_access(text):
+        return None
+    bucket_arn, objects_arn = bucket_arns(bucket_name)
+    principal = {"AWS": principals[0] if len(principals) == 1 else principals}
+    return _policy(
+        {
+            "Sid": "CrossAccountList",
+            "Effect": "Allow",
+            "Principal": principal,
+            "Action": "s3:ListBucket",
+            "Resource": bucket_arn,
+        },
+        {
+            "Sid": "CrossAccountRead",
+            "Effect": "Allow",
+            "Principal": principal,
+            "Action": "s3:GetObject",
+            "Resource": objects_arn,
+        },
+    )
+
+
+def write_only_principal(bucket_name, text):
+    principals = extract_principals(text)
+    if len(principals) != 1:
+        return None
+    _, objects_arn = bucket_arns(bucket_name)
+    return _policy(
+        {
+            "Sid": "WriteOnlyPrincipal",
+            "Effect": "Allow",
+            "Principal": {"AWS": principals[0]},
+            "Action": "s3:PutObject",
+            "Resource": objects_arn,
+        }
+    )
+
+
+def public_read_only(bucket_name, text):
+    _, objects_arn = bucket_arns(bucket_name)
+    return _policy(
+        {
+            "Sid": "PublicReadGetObject",
+            "Effect": "Allow",
+            "Principal": "*",
+            "Action": "s3:GetObject",
+            "Resource": objects_arn,
+        }
+    )
+
+
+# (name, keywords, access granted, builder). A template is used only when it is
+# the one template whose keywords match, grants every kind of access the
+# requirement mentions and its builder can fill in every parameter.
+TEMPLATES = [
+    (
+        "deny_insecure_transport",
+        ("tls", "ssl", "https", "secure transport", "in transit", "non-secure"),
+        frozenset(),
+        deny_insecure_transport,
+    ),
+    (
+        "cloudfront_oac",
+        ("cloudfront", "oac", "origin access"),
+        frozenset({"read"}),
+        cloudfront_oac,
+    ),
+    (
+        "cross_account_read",
+        ("cross account", "cross-account", "another account", "other account"),
+        frozenset({"read"}),
+        cross_account_read,
+    ),
+    (
+        "write_only_principal",
+        ("write only", "write-only", "upload only", "upload-only"),
+        frozenset({"write"}),
+        write_only_principal,
+    ),
+    (
+        "public_read_only",
+        ("public read", "read only public", "read-only public", "public website", "static website",
+         "publicly readable", "public access to read"),
+        frozenset({"read"}),
+        public_read_only,
+    ),
+]
+
+
+def match_template(requirements, bucket_name):
+    """Return (template_name, policy_dict) for the one matching template, or None
+
+    Requirements matching several templates, or asking for access the template
+    does not grant, are left to the LLM rather than answered partially.
+    """
+    text_lower = requirements.lower()
+    matches = [
+        (name, grants, builder)
+        for name, keywords, grants, builder in TEMPLATES
+        if any(keyword in text_lower for keyword in keywords)
+    ]
+    if len(matches) != 1:
+        return None
+    name, grants, builder = matches[0]
+    if not requested_access(requirements) <= grants:
+        return None
+    policy = builder(bucket_name, requirements)
+    return None if policy is None else (name, policy)
+
+
+def render_policy(requirements, bucket_name):
+    """Policy JSON from a template, or None when the LLM should be used"""
+    match = match_template(requirements, bucket_name)
+    if match is None:
+        return None
+    return json.dumps(match[1], indent=2)
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    """Runs speculative work on a small shared thread pool and keeps the results
+
+    Work is keyed, so asking for the same thing twice while it is in flight or
+    fresh reuses the first run. Results expire after their TTL; failed runs are
+    dropped so the next submit retries. The pool is started on first use.
+    """
+
+    def __init__(self, max_workers=4, max_entries=10000, enabled=True):
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._executor = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_workers=int(os.getenv("EMA_PREFETCH_WORKERS", "4")),
+            max_entries=int(os.getenv("EMA_PREFETCH_MAX_ENTRIES", "10000")),
+            enabled=os.getenv("EMA_PREFETCH", "1").lower() not in ("0", "false", "no"),
+        )
+
+    def _entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, future = entry
+        if expires < time.monotonic() or (future.done() and future.exception() is not None):
+            del self._entries[key]
+            return None
+        return future
+
+    def submit(self, key, ttl, fn, *args):
+        """Start fn(*args) in the background unless the same key is in flight or fresh"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            future = self._entry(key)
+            if future is not None:
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="prefetch"
+                )
+            future = self._executor.submit(fn, *args)
+            self._entries[key] = (time.monotonic() + ttl, future)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return future
+
+    def get(self, key, timeout=0):
+        """The result for a key, waiting up to `timeout` seconds; None if unknown, failed or not ready"""
+        with self._lock:
+            future = self._entry(key)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            # Not finished within the timeout, or failed
+            return None
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._entries.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,310 @@
+import asyncio
+import os
+import secrets
+import time
+import tracemalloc
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from client import S3BucketAssistant, prefetcher, server_client
+from session_store import SessionStore
+
+
+class Session:
+    """A hosted assistant plus the bookkeeping needed to schedule and evict it"""
+
+    __slots__ = ("assistant", "last_used", "lock")
+
+    def __init__(self, assistant):
+        self.assistant = assistant
+        self.last_used = time.monotonic()
+        self.lock = None
+
+
+class SessionManager:
+    """Hosts many assistant sessions in one process with LRU and idle-TTL eviction
+
+    Turns are serialized per session, while model calls run on a bounded thread
+    pool so a slow LLM response never blocks other sessions. With a store, each
+    turn is snapshotted and sessions missing from memory are resumed lazily.
+    The session table itself is not locked: only the event loop may use it,
+    and store I/O runs on the thread pool so it never blocks the loop.
+    """
+
+    def __init__(self, max_sessions=10000, idle_ttl=1800, llm_concurrency=32, store=None):
+        self.store = store
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.executor = ThreadPoolExecutor(
+            max_workers=llm_concurrency, thread_name_prefix="assistant"
+        )
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def evict(self):
+        """Drop idle sessions, then the least recently used beyond max_sessions
+
+        Sessions in the middle of a turn are never dropped, so the count can
+        briefly exceed max_sessions when all the oldest ones are busy.
+        """
+        cutoff = time.monotonic() - self.idle_ttl
+        evicted = []
+        # One pass from least to most recently used
+        for session_id, session in self._sessions.items():
+            over_limit = len(self._sessions) - len(evicted) > self.max_sessions
+            if session.last_used >= cutoff and not over_limit:
+                break
+            if session.lock is not None and session.lock.locked():
+                continue
+            evicted.append(session_id)
+        for session_id in evicted:
+            del self._sessions[session_id]
+        return len(evicted)
+
+    async def create(self, assistant=None):
+        session_id = secrets.token_urlsafe(16)
+        session = Session(assistant or S3BucketAssistant())
+        self._sessions[session_id] = session
+        self.evict()
+        if self.store is not None:
+            await self._run(self.save, session_id, session)
+        return session_id
+
+    async def get(self, session_id):
+        self.evict()
+        session = self._sessions.get(session_id)
+        if session is None:
+            state = None
+            if self.store is not None:
+                state = await self._run(self.store.load, session_id)
+            if state is None:
+                raise KeyError(session_id)
+            # Another request may have resumed the same session while this one loaded it
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(S3BucketAssistant.from_state(state))
+                self._sessions[session_id] = session
+                self.evict()
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def save(self, session_id, session):
+        if self.store is not None:
+            self.store.save(session_id, session.assistant.to_state())
+
+    async def close(self, session_id):
+        closed = self._sessions.pop(session_id, None) is not None
+        if self.store is not None:
+            closed = await self._run(self.store.delete, session_id) or closed
+        return closed
+
+    async def prune(self):
+        """Delete snapshots of sessions idle for longer than idle_ttl, which can no longer be resumed"""
+        if self.store is None:
+            return 0
+        return await self._run(self.store.prune, self.idle_ttl)
+
+    async def prune_periodically(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            await self.prune()
+
+    def _turn(self, session_id, session, fn, *args):
+        result = fn(*args)
+        self.save(session_id, session)
+        return result
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def chat(self, session_id, message):
+        session = await self.get(session_id)
+        if session.lock is None:
+            session.lock = asyncio.Lock()
+        async with session.lock:
+            return await self._run(
+                self._turn, session_id, session, session.assistant.chat, message
+            )
+
+    async def stream_chat(self, session_id, message):
+        session = await self.get(session_id)
+        if session.lock is None:
+            session.lock = asyncio.Lock()
+        async with session.lock:
+            chunks = await self._run(session.assistant.chat, message, True)
+            while True:
+                chunk = await self._run(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+            await self._run(self.save, session_id, session)
+        session.last_used = time.monotonic()
+
+    async def _server_call(self, session_id, call):
+        # MCP server calls go through the shared async pool, so no worker thread is held
+        session = await self.get(session_id)
+        if session.lock is None:
+            session.lock = asyncio.Lock()
+        async with session.lock:
+            result = await call(session.assistant)
+            await self._run(self.save, session_id, session)
+            return result
+
+    async def create_bucket(self, session_id):
+        return await self._server_call(
+            session_id, lambda assistant: assistant.acreate_bucket()
+        )
+
+    async def apply_policy(self, session_id):
+        return await self._server_call(
+            session_id, lambda assistant: assistant.aapply_policy()
+        )
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        if self.store is not None:
+            self.store.close()
+
+
+def measure_session_memory(count=1000):
+    """Average bytes allocated per idle session, measured with tracemalloc"""
+    manager = SessionManager(max_sessions=count)
+
+    async def create_sessions():
+        for _ in range(count):
+            await manager.create()
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    asyncio.run(create_sessions())
+    after = tracemalloc.take_snapshot()
+    if not tracing:
+        tracemalloc.stop()
+    manager.shutdown()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return allocated / count
+
+
+app = FastAPI()
+sessions = SessionManager(
+    max_sessions=int(os.getenv("EMA_MAX_SESSIONS", "10000")),
+    idle_ttl=float(os.getenv("EMA_SESSION_IDLE_TTL", "1800")),
+    llm_concurrency=int(os.getenv("EMA_LLM_CONCURRENCY", "32")),
+    store=(
+        SessionStore(os.getenv("EMA_SESSION_STORE"))
+        if os.getenv("EMA_SESSION_STORE")
+        else None
+    ),
+)
+
+
+class ChatRequest(BaseModel):
+    message: str
+    stream: bool = False
+
+
+def _config(assistant):
+    return {
+        "bucket_name": assistant.bucket_name,
+        "name_confirmed": assistant.name_confirmed,
+        "versioning": assistant.versioning,
+        "tags": assistant.tags,
+        "public_access_block": assistant.public_access_block,
+        "policy": assistant.policy,
+    }
+
+
+# How often snapshots of sessions idle past EMA_SESSION_IDLE_TTL are deleted from the store
+PRUNE_INTERVAL = float(os.getenv("EMA_SESSION_PRUNE_INTERVAL", "300"))
+prune_task = None
+
+
+@app.on_event("startup")
+async def startup():
+    global prune_task
+    if sessions.store is not None:
+        prune_task = asyncio.ensure_future(sessions.prune_periodically(PRUNE_INTERVAL))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if prune_task is not None:
+        prune_task.cancel()
+    sessions.shutdown()
+    prefetcher.shutdown()
+    await server_client.aclose()
+    server_client.close()
+
+
+# Endpoints that touch the session table are all async so they run on the event loop
+@app.post("/sessions")
+async def create_session():
+    return {"session_id": await sessions.create()}
+
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    try:
+        return _config((await sessions.get(session_id)).assistant)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown or expired session.")
+
+
+@app.get("/sessions/{session_id}/metrics")
+async def get_session_metrics(session_id: str):
+    try:
+        return (await sessions.get(session_id)).assistant.get_metrics_summary()
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown or expired session.")
+
+
+@app.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    if not await sessions.close(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session.")
+    return {"status": "closed"}
+
+
+@app.post("/sessions/{session_id}/chat")
+async def chat(session_id: str, req: ChatRequest):
+    try:
+        await sessions.get(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown or expired session.")
+    if req.stream:
+        return StreamingResponse(
+            sessions.stream_chat(session_id, req.message),
+            media_type="text/plain; charset=utf-8",
+        )
+    response = await sessions.chat(session_id, req.message)
+    return {"response": response}
+
+
+@app.post("/sessions/{session_id}/create_bucket")
+async def create_bucket(session_id: str):
+    try:
+        success, message = await sessions.create_bucket(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown or expired session.")
+    return {"success": success, "message": message}
+
+
+@app.post("/sessions/{session_id}/apply_policy")
+async def apply_policy(session_id: str):
+    try:
+        success, message = await sessions.apply_policy(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown or expired session.")
+    return {"success": success, "message": message}
+
+
+@app.get("/stats")
+async def stats():
+    return {"sessions": len(sessions), "max_sessions": sessions.max_sessions}
@@ -0,0 +1,61 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class SessionStore:
+    """SQLite-backed snapshots of assistant sessions
+
+    Each session is one row holding its compact JSON state, so resuming a
+    session after a restart is a single indexed read instead of a replay.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def save(self, session_id, state):
+        data = json.dumps(state, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, updated) "
+                "VALUES (?, ?, ?)",
+                (session_id, data, time.time()),
+            )
+            self._conn.commit()
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, session_id):
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def prune(self, older_than):
+        """Delete snapshots not updated within the last older_than seconds"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE updated < ?", (time.time() - older_than,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,73 @@
+import json
+import os
+import random
+import sys
+import time
+import pytest
+
+# bulk_provision uses the server's bare imports (from aws_tools import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp_server"))
+import bulk_provision
+from bucket_names import validate_bucket_name
+
+RECORDS = 60
+FAIL_AT = 37
+
+
+class Interrupted(Exception):
+    pass
+
+
+def write_manifest(path):
+    with open(path, "w") as f:
+        for index in range(RECORDS):
+            f.write(json.dumps({"bucket_name": f"resume-test-{index:03d}"}) + "\n")
+
+
+def fake_provision(fail_at=None):
+    rng = random.Random(0)
+
+    def provision_one(spec, reconcile=False):
+        # Random delays make records finish out of order across the workers
+        time.sleep(rng.random() * 0.01)
+        if fail_at is not None and spec["bucket_name"] == f"resume-test-{fail_at:03d}":
+            raise Interrupted(spec["bucket_name"])
+        return {"status": "success", "result": spec["bucket_name"]}
+
+    return provision_one
+
+
+def test_resume_after_interruption_writes_one_result_per_record(tmp_path, monkeypatch):
+    manifest = str(tmp_path / "manifest.jsonl")
+    results = str(tmp_path / "results.jsonl")
+    checkpoint = str(tmp_path / "manifest.checkpoint")
+    write_manifest(manifest)
+
+    monkeypatch.setattr(bulk_provision, "provision_one", fake_provision(fail_at=FAIL_AT))
+    with pytest.raises(Interrupted):
+        bulk_provision.provision_manifest(manifest, results, checkpoint, concurrency=4, checkpoint_every=5)
+    watermark, done, _ = bulk_provision.load_checkpoint(checkpoint)
+    assert 0 < watermark < RECORDS
+
+    monkeypatch.setattr(bulk_provision, "provision_one", fake_provision())
+    summary = bulk_provision.provision_manifest(manifest, results, checkpoint, concurrency=4, checkpoint_every=5)
+    assert summary["completed"] == RECORDS
+    assert summary["resumed_from"] == watermark
+
+    with open(results) as f:
+        indexes = [json.loads(line)["index"] for line in f]
+    assert sorted(indexes) == list(range(RECORDS))
+
+
+@pytest.mark.parametrize("name, valid", [
+    ("my-bucket.logs", True),
+    ("ab", False),
+    ("a" * 64, False),
+    ("My-Bucket", False),
+    ("-bucket", False),
+    ("xn--bucket", False),
+    ("bucket-s3alias", False),
+    ("", False),
+])
+def test_validate_bucket_name(name, valid):
+    assert validate_bucket_name(name)[0] is valid
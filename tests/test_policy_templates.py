@@ -0,0 +1,92 @@
+import json
+import pytest
+from mcp_server.policy_validator import policy_errors
+from policy_templates import TEMPLATES, match_template, render_policy
+
+BUCKET = "my-data-bucket"
+BLOCK_ALL = {
+    "BlockPublicAcls": True,
+    "IgnorePublicAcls": True,
+    "BlockPublicPolicy": True,
+    "RestrictPublicBuckets": True,
+}
+
+# Requirements that select each template, with every parameter it needs
+SAMPLES = {
+    "deny_insecure_transport": "Deny any request that is not over TLS",
+    "cloudfront_oac": "Let CloudFront distribution arn:aws:cloudfront::123456789012:distribution/E2QWRUHAPOMQZL read objects",
+    "cross_account_read": "Give cross-account read access to 123456789012 and arn:aws:iam::210987654321:role/Reader",
+    "write_only_principal": "Make it write-only for arn:aws:iam::123456789012:role/Uploader",
+    "public_read_only": "Host a static website with public read access",
+}
+PUBLIC_TEMPLATES = {"public_read_only"}
+
+
+def test_every_template_has_a_sample():
+    assert set(SAMPLES) == {name for name, _, _, _ in TEMPLATES}
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_template_renders_a_valid_policy(name):
+    matched = match_template(SAMPLES[name], BUCKET)
+    assert matched is not None and matched[0] == name
+    rendered = render_policy(SAMPLES[name], BUCKET)
+    assert json.loads(rendered) == matched[1]
+    assert policy_errors(rendered, BUCKET) == []
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_template_against_blocking_public_access_block(name):
+    errors = policy_errors(render_policy(SAMPLES[name], BUCKET), BUCKET, BLOCK_ALL)
+    assert bool(errors) is (name in PUBLIC_TEMPLATES)
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_rendering_is_deterministic(name):
+    assert render_policy(SAMPLES[name], BUCKET) == render_policy(SAMPLES[name], BUCKET)
+
+
+def test_templates_missing_parameters_fall_back():
+    assert render_policy("Let CloudFront read objects", BUCKET) is None
+    assert render_policy("cross-account read access please", BUCKET) is None
+    assert render_policy("nothing we have a template for", BUCKET) is None
+
+
+@pytest.mark.parametrize(
+    "requirements",
+    [
+        # Access the template does not grant
+        "cross-account write access for account 111122223333",
+        "grant another account 111122223333 permission to delete objects",
+        "cross account read and write access for 111122223333",
+        "make it write-only for arn:aws:iam::123456789012:role/Uploader and let it delete old files",
+        "public read and upload access for the static website",
+        "deny non-https and allow full access for everyone",
+        # No kind of access named at all
+        "set up cross-account access for 111122223333",
+        # Several templates match; using one would drop the rest
+        "allow cross account full access for 111122223333 over TLS only",
+        "public read for the website but deny non-https",
+        "CloudFront arn:aws:cloudfront::123456789012:distribution/E2QWRUHAPOMQZL reads it and uploads are write-only for 123456789012",
+    ],
+)
+def test_requirements_templates_cannot_fully_express_fall_back(requirements):
+    assert match_template(requirements, BUCKET) is None
+    assert render_policy(requirements, BUCKET) is None
+
+
+def test_access_words_match_whole_word_starts():
+    assert match_template("cross-account downloads for 111122223333", BUCKET)[0] == "cross_account_read"
+    # "output" is not "put", and "already" is not "read"
+    assert match_template("static website for output that is already built", BUCKET)[0] == "public_read_only"
+
+
+def test_assistant_refuses_public_template_when_public_policies_are_blocked():
+    from client import S3BucketAssistant
+
+    assistant = S3BucketAssistant()
+    assistant.bucket_name = BUCKET
+    assert assistant.generate_policy(SAMPLES["public_read_only"]) is not None
+    assistant.public_access_block = BLOCK_ALL
+    assert assistant.generate_policy(SAMPLES["public_read_only"]) is None
+    assert assistant.generate_policy(SAMPLES["deny_insecure_transport"]) is not None
@@ -0,0 +1,169 @@
+import json
+import pytest
+from mcp_server.policy_validator import (
+    MAX_POLICY_BYTES,
+    PolicyValidationError,
+    check_policy,
+    is_public_statement,
+    policy_errors,
+)
+
+
+def policy(**statement):
+    return {
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Effect": "Allow",
+                "Principal": "*",
+                "Action": "s3:GetObject",
+                "Resource": "arn:aws:s3:::my-bucket/*",
+                **statement,
+            }
+        ],
+    }
+
+
+def test_valid_policy_as_dict_and_json():
+    assert policy_errors(policy(), "my-bucket") == []
+    assert policy_errors(json.dumps(policy()), "my-bucket") == []
+
+
+@pytest.mark.parametrize(
+    "principal",
+    [
+        "arn:aws:iam::123456789012:root",
+        "arn:aws:iam::123456789012:role/path/to/Role",
+        "arn:aws:iam::123456789012:user/alice@example.com",
+        "arn:aws:sts::123456789012:assumed-role/Role/session-name",
+        "arn:aws:sts::123456789012:federated-user/bob",
+        "arn:aws:iam::cloudfront:user/CloudFront Origin Access Identity E2QWRUHAPOMQZL",
+        "arn:aws-cn:iam::123456789012:root",
+        "arn:aws-us-gov:iam::123456789012:role/Role",
+        "arn:aws-iso:iam::123456789012:root",
+        "arn:aws-iso-b:iam::123456789012:root",
+        "123456789012",
+        "*",
+    ],
+)
+def test_accepts_aws_principals_s3_accepts(principal):
+    assert policy_errors(policy(Principal={"AWS": principal}), "my-bucket") == []
+
+
+@pytest.mark.parametrize(
+    "principal",
+    ["alice", "arn:aws:s3:::my-bucket", "arn:aws:iam::123456789012", "arn:aws:ec2::123456789012:role/x", ""],
+)
+def test_rejects_malformed_aws_principals(principal):
+    errors = policy_errors(policy(Principal={"AWS": principal}), "my-bucket")
+    assert errors == ['Policy.Statement[0].Principal.AWS must be "*", an account ID or an IAM or STS principal ARN.']
+
+
+def test_principal_lists_report_each_bad_element():
+    errors = policy_errors(policy(Principal={"AWS": ["123456789012", "bad", "worse"]}), "my-bucket")
+    assert errors == [
+        'Policy.Statement[0].Principal.AWS[1] must be "*", an account ID or an IAM or STS principal ARN.',
+        'Policy.Statement[0].Principal.AWS[2] must be "*", an account ID or an IAM or STS principal ARN.',
+    ]
+
+
+@pytest.mark.parametrize(
+    "principal, valid",
+    [
+        ({"Service": "cloudfront.amazonaws.com"}, True),
+        ({"Service": "logging.s3.amazonaws.com"}, True),
+        ({"Service": "cloudfront"}, False),
+        ({"CanonicalUser": "a" * 64}, True),
+        ({"CanonicalUser": "abc"}, False),
+        ({}, False),
+        ({"Group": "everyone"}, False),
+        (["*"], False),
+    ],
+)
+def test_other_principal_types(principal, valid):
+    assert (policy_errors(policy(Principal=principal), "my-bucket") == []) is valid
+
+
+@pytest.mark.parametrize(
+    "resource",
+    ["arn:aws:s3:::my-bucket", "arn:aws:s3:::my-bucket/*", "arn:aws-iso:s3:::my-bucket/logs/*", "arn:aws:s3:::my-*/*"],
+)
+def test_accepts_resources_for_the_bucket(resource):
+    assert policy_errors(policy(Resource=resource), "my-bucket") == []
+
+
+def test_rejects_resources_for_another_bucket():
+    errors = policy_errors(policy(Resource="arn:aws:s3:::other-bucket/*"), "my-bucket")
+    assert errors == ["Statement[0].Resource arn:aws:s3:::other-bucket/* does not refer to bucket my-bucket."]
+    # Without a bucket name there is nothing to match against
+    assert policy_errors(policy(Resource="arn:aws:s3:::other-bucket/*")) == []
+
+
+@pytest.mark.parametrize("action", ["s3:GetObject", "s3:*", "s3:Get*", "S3:PutObject", "*", ["s3:GetObject", "s3:ListBucket"]])
+def test_accepts_actions(action):
+    assert policy_errors(policy(Action=action), "my-bucket") == []
+
+
+@pytest.mark.parametrize("action", ["ec2:RunInstances", "GetObject", [], 3])
+def test_rejects_actions(action):
+    assert policy_errors(policy(Action=action), "my-bucket")
+
+
+def test_conditions():
+    condition = {
+        "StringEquals": {"aws:SourceArn": "arn:aws:cloudfront::123456789012:distribution/E1"},
+        "ForAnyValue:StringLikeIfExists": {"s3:prefix": ["logs/*", "tmp/*"]},
+        "Bool": {"aws:SecureTransport": False},
+        "Null": {"s3:x-amz-server-side-encryption": "true"},
+    }
+    assert policy_errors(policy(Condition=condition), "my-bucket") == []
+    assert policy_errors(policy(Condition={"StringEqual": {"aws:SourceArn": "x"}}), "my-bucket") == [
+        "Policy.Statement[0].Condition.StringEqual is not a valid policy element."
+    ]
+    assert policy_errors(policy(Condition={"StringEquals": {}}), "my-bucket") == [
+        "Policy.Statement[0].Condition.StringEquals cannot be empty."
+    ]
+
+
+def test_statement_structure():
+    statement = policy()["Statement"][0]
+    del statement["Effect"]
+    statement["NotAction"] = "s3:DeleteObject"
+    statement["Foo"] = 1
+    errors = policy_errors({"Statement": statement}, "my-bucket")
+    assert errors == [
+        "Policy.Statement is missing Effect.",
+        "Policy.Statement must have exactly one of Action or NotAction.",
+        "Policy.Statement.Foo is not a valid policy element.",
+    ]
+
+
+def test_document_level_errors():
+    assert policy_errors("{not json", "my-bucket")[0].startswith("Policy is not valid JSON")
+    assert policy_errors("x" * (MAX_POLICY_BYTES + 1)) == ["Policy is larger than 20 KB."]
+    assert policy_errors({**policy(), "Version": "2020-01-01"}) == [
+        "Policy.Version must be one of 2008-10-17, 2012-10-17."
+    ]
+    assert policy_errors({}) == ["Policy is missing Statement."]
+    assert policy_errors([]) == ["Policy must be an object."]
+
+
+def test_public_statements():
+    assert is_public_statement(policy()["Statement"][0])
+    assert is_public_statement(policy(Principal={"AWS": ["*"]})["Statement"][0])
+    assert not is_public_statement(policy(Effect="Deny")["Statement"][0])
+    assert not is_public_statement(policy(Principal={"AWS": "123456789012"})["Statement"][0])
+    restricted = policy(Condition={"StringEquals": {"AWS:SourceAccount": "123456789012"}})
+    assert not is_public_statement(restricted["Statement"][0])
+
+
+def test_public_access_block_conflict():
+    blocking = {"BlockPublicPolicy": True}
+    assert policy_errors(policy(), "my-bucket", {"BlockPublicPolicy": False}) == []
+    assert policy_errors(policy(), "my-bucket", blocking) == [
+        "Statement[0] grants public access, which BlockPublicPolicy in the public access block rejects."
+    ]
+    with pytest.raises(PolicyValidationError) as excinfo:
+        check_policy(policy(), "my-bucket", blocking)
+    assert isinstance(excinfo.value, ValueError)
+    assert len(excinfo.value.errors) == 1
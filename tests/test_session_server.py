@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from session_server import Session, SessionManager
+
+
+def add_session(manager, session_id, locked=False, idle_for=0.0):
+    session = Session(assistant=None)
+    session.last_used = time.monotonic() - idle_for
+    if locked:
+        session.lock = asyncio.Lock()
+        # An uncontended acquire completes without a running event loop
+        asyncio.run(session.lock.acquire())
+    manager._sessions[session_id] = session
+    return session
+
+
+def evict_within(manager, seconds=5):
+    """evict() on a helper thread, failing instead of hanging if it never returns"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(manager.evict()), daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert result, f"evict() did not return within {seconds}s"
+    return result[0]
+
+
+def test_evict_returns_when_every_session_over_the_limit_is_mid_turn():
+    manager = SessionManager(max_sessions=1)
+    try:
+        add_session(manager, "a", locked=True)
+        add_session(manager, "b", locked=True)
+        add_session(manager, "c", locked=True)
+        assert evict_within(manager) == 0
+        # Busy sessions are kept, in their original order, even over the limit
+        assert list(manager._sessions) == ["a", "b", "c"]
+    finally:
+        manager.shutdown()
+
+
+def test_evict_drops_unlocked_sessions_over_the_limit_and_skips_busy_ones():
+    manager = SessionManager(max_sessions=2)
+    try:
+        add_session(manager, "busy", locked=True)
+        add_session(manager, "old")
+        add_session(manager, "newer")
+        add_session(manager, "newest")
+        assert manager.evict() == 2
+        assert list(manager._sessions) == ["busy", "newest"]
+    finally:
+        manager.shutdown()
+
+
+def test_idle_ttl_eviction_drops_unlocked_sessions_only():
+    manager = SessionManager(max_sessions=10, idle_ttl=60)
+    try:
+        add_session(manager, "idle", idle_for=120)
+        add_session(manager, "idle-busy", locked=True, idle_for=120)
+        add_session(manager, "also-idle", idle_for=90)
+        add_session(manager, "fresh")
+        assert manager.evict() == 2
+        assert list(manager._sessions) == ["idle-busy", "fresh"]
+    finally:
+        manager.shutdown()
+
+
+def test_get_resumes_from_store_and_expires_unknown_sessions():
+    class Store:
+        def __init__(self):
+            self.states = {}
+
+        def save(self, session_id, state):
+            self.states[session_id] = state
+
+        def load(self, session_id):
+            return self.states.get(session_id)
+
+        def close(self):
+            pass
+
+    manager = SessionManager(max_sessions=1, store=Store())
+
+    async def scenario():
+        first = await manager.create()
+        (await manager.get(first)).assistant.bucket_name = "resumed-bucket"
+        manager.save(first, manager._sessions[first])
+        await manager.create()
+        assert first not in manager._sessions
+        assert (await manager.get(first)).assistant.bucket_name == "resumed-bucket"
+        try:
+            await manager.get("missing")
+        except KeyError:
+            return True
+        return False
+
+    try:
+        assert asyncio.run(scenario())
+    finally:
+        manager.shutdown()
@@ -0,0 +1,34 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mcp_server"))
+import aws_tools
+
+
+def test_store_evicts_oldest_entries_over_the_limit(monkeypatch):
+    monkeypatch.setattr(aws_tools, "_state_cache", aws_tools.OrderedDict())
+    monkeypatch.setattr(aws_tools, "STATE_CACHE_MAX_ENTRIES", 3)
+    for index in range(5):
+        aws_tools.store_bucket_state(f"bucket-{index}", {"index": index})
+    assert list(aws_tools._state_cache) == ["bucket-2", "bucket-3", "bucket-4"]
+    assert aws_tools.cached_bucket_state("bucket-0") is None
+    assert aws_tools.cached_bucket_state("bucket-4") == {"index": 4}
+
+
+def test_store_prunes_expired_entries_for_other_buckets(monkeypatch):
+    monkeypatch.setattr(aws_tools, "_state_cache", aws_tools.OrderedDict())
+    monkeypatch.setattr(aws_tools, "STATE_CACHE_TTL", -1)
+    aws_tools.store_bucket_state("stale", {})
+    monkeypatch.setattr(aws_tools, "STATE_CACHE_TTL", 30)
+    aws_tools.store_bucket_state("fresh", {})
+    assert list(aws_tools._state_cache) == ["fresh"]
+
+
+def test_restoring_a_bucket_moves_it_behind_newer_entries(monkeypatch):
+    monkeypatch.setattr(aws_tools, "_state_cache", aws_tools.OrderedDict())
+    monkeypatch.setattr(aws_tools, "STATE_CACHE_MAX_ENTRIES", 2)
+    aws_tools.store_bucket_state("a", {})
+    aws_tools.store_bucket_state("b", {})
+    aws_tools.store_bucket_state("a", {"refreshed": True})
+    aws_tools.store_bucket_state("c", {})
+    assert list(aws_tools._state_cache) == ["a", "c"]